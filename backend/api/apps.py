@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from . import (  # noqa: F401
+            authentication,
+            cache,
+            ingredient_index,
+            renditions,
+            short_links,
+        )
@@ -0,0 +1,159 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+from .cache import bump_versions, get_version
+
+# Поля, которые меняются через update() в обход save(). В снимок
+# они не входят: при обращении они читаются из базы, а save()
+# восстановленного пользователя их не перезаписывает.
+VOLATILE_USER_FIELDS = frozenset(["recipes_count", "subscribers_count"])
+SNAPSHOT_FIELDS = [
+    field
+    for field in User._meta.concrete_fields
+    if field.name not in VOLATILE_USER_FIELDS
+]
+
+
+def get_auth_version_key(user_id):
+    # Версия пользователя и его токенов: меняется при сохранении
+    # пользователя и удалении любого из его токенов.
+    return f"api:auth-version:{user_id}"
+
+
+def take_snapshot(user):
+    values = []
+    for field in SNAPSHOT_FIELDS:
+        value = getattr(user, field.attname)
+        if isinstance(value, FieldFile):
+            value = value.name
+        values.append(value)
+    return tuple(values)
+
+
+def restore_snapshot(values):
+    # Каждый запрос получает новый объект и свою копию значений,
+    # поэтому изменения пользователя в одном запросе не видны другим.
+    return User.from_db(
+        User.objects.db,
+        [field.attname for field in SNAPSHOT_FIELDS],
+        copy.deepcopy(values),
+    )
+
+
+class TokenCache:
+    # Локальный LRU процесса: ключ токена -> снимок пользователя,
+    # версия и срок годности записи. Секреты в общий кэш не попадают,
+    # а сохранение пользователя или удаление токена в любом процессе
+    # меняет версию, после чего токен заново проверяется по базе.
+    # Изменения через update() без смены версии видны не позже,
+    # чем через AUTH_TOKEN_CACHE_TTL секунд.
+
+    def __init__(self, size=None, ttl=None):
+        self.size = size if size is not None else getattr(
+            settings, "AUTH_TOKEN_CACHE_SIZE", 1000
+        )
+        self.ttl = ttl if ttl is not None else getattr(
+            settings, "AUTH_TOKEN_CACHE_TTL", 60
+        )
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+        user_id, version, expires_at, values = entry
+        if time.monotonic() >= expires_at or get_version(
+            get_auth_version_key(user_id)
+        ) != version:
+            self.delete([key])
+            return None
+        return restore_snapshot(values)
+
+    def set(self, key, user, version):
+        entry = (
+            user.pk, version, time.monotonic() + self.ttl, take_snapshot(user)
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def forget_user(self, user_id):
+        with self._lock:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if entry[0] == user_id
+            ]
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def forget_user(user_id):
+    token_cache.forget_user(user_id)
+    bump_versions([get_auth_version_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            return self.verify_credentials(key)
+        if not user.is_active:
+            token_cache.delete([key])
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+        return user, Token(key=key, user=user)
+
+    def verify_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        # Версия читается после проверки, а токен проверяется ещё раз:
+        # если его удалили в промежутке, в кэш он не попадёт, а если
+        # после - версия к следующему запросу уже изменится.
+        version = get_version(get_auth_version_key(user.pk))
+        if Token.objects.filter(key=key).exists():
+            token_cache.set(key, user, version)
+        return user, token
+
+
+@receiver(post_save, sender=User)
+def forget_saved_user(sender, instance, raw=False, **kwargs):
+    if not raw:
+        forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.delete([instance.key])
+    bump_versions([get_auth_version_key(instance.user_id)])
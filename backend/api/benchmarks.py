@@ -0,0 +1,340 @@
+import base64
+import io
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from food.models import Ingredient, Recipe, Tag
+from users.models import User
+from .short_links import encode_short_code
+
+Route = namedtuple(
+    "Route",
+    ["name", "method", "path", "auth", "data", "store"],
+    defaults=[False, None, None],
+)
+Result = namedtuple("Result", ["status", "duration", "queries"])
+
+# auth: False - анонимно, True - по токену пользователя, "metrics" -
+# по METRICS_TOKEN. Запросы на изменение идут парами, чтобы после
+# прохода данные вернулись в исходное состояние.
+ROUTES = [
+    Route("recipes-list", "get", "/api/recipes/"),
+    Route(
+        "recipes-list?tags&author",
+        "get",
+        "/api/recipes/?tags={tag}&author={author}",
+    ),
+    Route("recipes-list?cursor", "get", "/api/recipes/?cursor="),
+    Route("recipes-list?search", "get", "/api/recipes/?search={search}"),
+    Route("recipes-detail", "get", "/api/recipes/{recipe}/"),
+    Route("recipes-get-link", "get", "/api/recipes/{recipe}/get-link/"),
+    Route("short-link", "get", "/s/{short_code}/"),
+    Route("tags-list", "get", "/api/tags/"),
+    Route("tags-detail", "get", "/api/tags/{tag_id}/"),
+    Route("ingredients-list", "get", "/api/ingredients/"),
+    Route(
+        "ingredients-list?name",
+        "get",
+        "/api/ingredients/?name={ingredient_prefix}",
+    ),
+    Route("ingredients-detail", "get", "/api/ingredients/{ingredient}/"),
+    Route("users-list", "get", "/api/users/"),
+    Route("users-detail", "get", "/api/users/{author}/"),
+    Route("metrics", "get", "/api/_metrics", "metrics"),
+    Route("users-me", "get", "/api/users/me/", True),
+    Route(
+        "recipes-list?is_favorited",
+        "get",
+        "/api/recipes/?is_favorited=1",
+        True,
+    ),
+    Route(
+        "recipes-list?is_in_shopping_cart",
+        "get",
+        "/api/recipes/?is_in_shopping_cart=1",
+        True,
+    ),
+    Route(
+        "users-subscriptions",
+        "get",
+        "/api/users/subscriptions/?recipes_limit=3",
+        True,
+    ),
+    Route("shopping_cart-list", "get", "/api/shopping_cart/", True),
+    Route(
+        "recipes-download-shopping-cart",
+        "get",
+        "/api/recipes/download_shopping_cart/",
+        True,
+    ),
+    Route(
+        "recipes-favorite",
+        "post",
+        "/api/recipes/{free_recipe}/favorite/",
+        True,
+    ),
+    Route(
+        "recipes-favorite",
+        "delete",
+        "/api/recipes/{free_recipe}/favorite/",
+        True,
+    ),
+    Route(
+        "recipes-shopping-cart",
+        "post",
+        "/api/recipes/{free_recipe}/shopping_cart/",
+        True,
+    ),
+    Route(
+        "recipes-shopping-cart",
+        "delete",
+        "/api/recipes/{free_recipe}/shopping_cart/",
+        True,
+    ),
+    Route(
+        "users-subscribe",
+        "post",
+        "/api/users/{free_author}/subscribe/",
+        True,
+    ),
+    Route(
+        "users-subscribe",
+        "delete",
+        "/api/users/{free_author}/subscribe/",
+        True,
+    ),
+    Route(
+        "recipes-bulk-favorite",
+        "post",
+        "/api/recipes/favorite/",
+        True,
+        "bulk_recipes",
+    ),
+    Route(
+        "recipes-bulk-favorite",
+        "delete",
+        "/api/recipes/favorite/",
+        True,
+        "bulk_recipes",
+    ),
+    Route(
+        "recipes-bulk-shopping-cart",
+        "post",
+        "/api/recipes/shopping_cart/",
+        True,
+        "bulk_recipes",
+    ),
+    Route(
+        "recipes-bulk-shopping-cart",
+        "delete",
+        "/api/recipes/shopping_cart/",
+        True,
+        "bulk_recipes",
+    ),
+    Route(
+        "users-bulk-subscribe",
+        "post",
+        "/api/users/subscribe/",
+        True,
+        "bulk_authors",
+    ),
+    Route(
+        "users-bulk-subscribe",
+        "delete",
+        "/api/users/subscribe/",
+        True,
+        "bulk_authors",
+    ),
+    Route(
+        "recipes-list",
+        "post",
+        "/api/recipes/",
+        True,
+        "recipe_data",
+        "created_recipe",
+    ),
+    Route(
+        "recipes-detail",
+        "patch",
+        "/api/recipes/{created_recipe}/",
+        True,
+        "recipe_data",
+    ),
+    Route("recipes-detail", "delete", "/api/recipes/{created_recipe}/", True),
+    Route(
+        "users-update-avatar",
+        "put",
+        "/api/users/me/avatar/",
+        True,
+        "avatar_data",
+    ),
+    Route("users-update-avatar", "delete", "/api/users/me/avatar/", True),
+]
+
+# Наибольшее допустимое число SQL-запросов, проверяется в
+# tests/test_query_budgets.py. Проверка токена и снимок пользователя
+# берутся из кэша процесса.
+QUERY_BUDGETS = {
+    "GET recipes-list": 4,
+    "GET recipes-list?tags&author": 4,
+    "GET recipes-list?cursor": 3,
+    "GET recipes-list?search": 4,
+    "GET recipes-detail": 3,
+    "GET recipes-get-link": 1,
+    "GET short-link": 1,
+    "GET tags-list": 0,
+    "GET tags-detail": 1,
+    "GET ingredients-list": 0,
+    "GET ingredients-list?name": 1,
+    "GET ingredients-detail": 1,
+    "GET users-list": 2,
+    "GET users-detail": 1,
+    "GET metrics": 0,
+    # Первый запрос с токеном после смены аватара в прогоне
+    # benchmark_api заново проверяет токен: ещё 2 запроса.
+    "GET users-me": 3,
+    "GET recipes-list?is_favorited": 4,
+    "GET recipes-list?is_in_shopping_cart": 4,
+    "GET users-subscriptions": 3,
+    "GET shopping_cart-list": 3,
+    "GET recipes-download-shopping-cart": 1,
+    "POST recipes-favorite": 5,
+    "DELETE recipes-favorite": 5,
+    "POST recipes-shopping-cart": 9,
+    "DELETE recipes-shopping-cart": 10,
+    "POST users-subscribe": 7,
+    "DELETE users-subscribe": 5,
+    "POST recipes-bulk-favorite": 5,
+    "DELETE recipes-bulk-favorite": 4,
+    "POST recipes-bulk-shopping-cart": 9,
+    "DELETE recipes-bulk-shopping-cart": 9,
+    "POST users-bulk-subscribe": 5,
+    "DELETE users-bulk-subscribe": 4,
+    "POST recipes-list": 29,
+    "PATCH recipes-detail": 28,
+    "DELETE recipes-detail": 19,
+    "PUT users-update-avatar": 1,
+    "DELETE users-update-avatar": 3,
+}
+
+
+def make_image_data(color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def build_context(user=None):
+    # Берутся самые «тяжёлые» объекты: популярный рецепт, автор с
+    # наибольшим числом рецептов и пользователь с корзиной.
+    user = user or (
+        User.objects.filter(shopping_cart__isnull=False).first()
+        or User.objects.order_by("pk").first()
+    )
+    recipe = Recipe.objects.order_by("-favorites_count", "pk").first()
+    author = User.objects.order_by("-recipes_count", "pk").first()
+    tag = Tag.objects.order_by("pk").first()
+    ingredient = Ingredient.objects.order_by("pk").first()
+    if None in (user, recipe, author, tag, ingredient):
+        return None
+
+    free_recipe = (
+        Recipe.objects.exclude(favorited_recipes__author=user)
+        .exclude(in_shopping_cart__author=user)
+        .order_by("-favorites_count", "pk")
+        .first()
+    )
+    free_author = (
+        User.objects.exclude(pk=user.pk)
+        .exclude(subscribers__user=user)
+        .order_by("-recipes_count", "pk")
+        .first()
+    )
+    context = {
+        "user": user,
+        "recipe": recipe.pk,
+        "short_code": encode_short_code(recipe.pk),
+        "author": author.pk,
+        "tag": tag.slug,
+        "tag_id": tag.pk,
+        "search": recipe.name.split()[0],
+        "ingredient": ingredient.pk,
+        "ingredient_prefix": ingredient.name[:3],
+        "recipe_data": {
+            "name": "Рецепт для замеров",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": make_image_data((200, 120, 40)),
+            "tags": [tag.pk],
+            "ingredients": [
+                {"id": pk, "amount": 10}
+                for pk in Ingredient.objects.order_by("pk").values_list(
+                    "pk", flat=True
+                )[:5]
+            ],
+        },
+        "avatar_data": {"avatar": make_image_data((40, 120, 200))},
+    }
+    if free_recipe is not None:
+        context["free_recipe"] = free_recipe.pk
+        context["bulk_recipes"] = {"ids": [free_recipe.pk]}
+    if free_author is not None:
+        context["free_author"] = free_author.pk
+        context["bulk_authors"] = {"ids": [free_author.pk]}
+    return context
+
+
+class RouteRunner:
+    def __init__(self, context, host="localhost"):
+        self.context = context
+        self.anonymous = APIClient(HTTP_HOST=host)
+        self.client = APIClient(HTTP_HOST=host)
+        token, _ = Token.objects.get_or_create(user=context["user"])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.metrics_client = APIClient(HTTP_HOST=host)
+        self.metrics_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {settings.METRICS_TOKEN}"
+        )
+
+    def get_client(self, route):
+        if route.auth == "metrics":
+            return self.metrics_client
+        return self.client if route.auth else self.anonymous
+
+    def is_available(self, route):
+        if route.auth == "metrics" and not settings.METRICS_TOKEN:
+            return False
+        if route.data and route.data not in self.context:
+            return False
+        try:
+            route.path.format(**self.context)
+        except KeyError:
+            return False
+        return True
+
+    def run(self, route):
+        client = self.get_client(route)
+        path = route.path.format(**self.context)
+        data = self.context[route.data] if route.data else None
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, route.method)(path, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            duration = time.perf_counter() - started
+        if route.store and response.status_code == 201:
+            self.context[route.store] = response.data["id"]
+        return Result(
+            response.status_code,
+            duration,
+            [query["sql"] for query in queries.captured_queries],
+        )
@@ -0,0 +1,164 @@
+from django.db import connection, transaction
+
+from food.counters import update_counters
+from food.models import (
+    Favorite,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    Subscription,
+)
+from food.shopping_list import change_shopping_lists
+from users.models import User
+from .cache import bump_user_versions
+
+# Модель, поле владельца, поле цели и модель цели.
+BULK_MODELS = {
+    Favorite: ("author", "recipe", Recipe),
+    ShoppingCart: ("author", "recipe", Recipe),
+    Subscription: ("user", "author", User),
+}
+
+
+def apply_side_effects(model, user, target_ids, delta):
+    # Связи пишутся SQL-запросами в обход сигналов, поэтому счётчики,
+    # списки покупок и версия данных пользователя обновляются явно.
+    _, target, _ = BULK_MODELS[model]
+    update_counters(
+        model,
+        [model(**{f"{target}_id": pk}) for pk in target_ids],
+        delta,
+    )
+    if model is ShoppingCart:
+        change_shopping_lists(
+            [(user.id, recipe_id) for recipe_id in target_ids], delta
+        )
+    if target_ids:
+        bump_user_versions([user.id])
+
+
+def get_columns(model):
+    owner, target, _ = BULK_MODELS[model]
+    return (
+        model._meta.db_table,
+        model._meta.get_field(owner).column,
+        model._meta.get_field(target).column,
+    )
+
+
+def get_defaults(model):
+    # Значения по умолчанию Django не попадают в схему базы,
+    # поэтому остальные колонки заполняются явно.
+    owner, target, _ = BULK_MODELS[model]
+    return [
+        (field.column, field.get_default())
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in (owner, target)
+    ]
+
+
+def insert_links(model, user, target_ids):
+    # Один INSERT ... ON CONFLICT DO NOTHING RETURNING: уже
+    # существующие связи не возвращаются, и гонка двух одинаковых
+    # запросов не заканчивается IntegrityError.
+    if not target_ids:
+        return []
+    table, owner_column, target_column = get_columns(model)
+    defaults = get_defaults(model)
+    columns = [owner_column, target_column]
+    columns += [column for column, _ in defaults]
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    params = []
+    for pk in target_ids:
+        params += [user.id, pk, *(value for _, value in defaults)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES {', '.join([row] * len(target_ids))} "
+            f"ON CONFLICT DO NOTHING RETURNING {target_column}",
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_links(model, user, target_ids=None):
+    # Один DELETE ... RETURNING; без target_ids удаляются все связи
+    # пользователя.
+    if target_ids is not None and not target_ids:
+        return []
+    table, owner_column, target_column = get_columns(model)
+    sql = f"DELETE FROM {table} WHERE {owner_column} = %s"
+    params = [user.id]
+    if target_ids is not None:
+        placeholders = ", ".join(["%s"] * len(target_ids))
+        sql += f" AND {target_column} IN ({placeholders})"
+        params += target_ids
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {target_column}", params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def add_links(model, user, target_ids):
+    with transaction.atomic():
+        added = insert_links(model, user, target_ids)
+        apply_side_effects(model, user, added, 1)
+    return added
+
+
+def remove_links(model, user, target_ids):
+    with transaction.atomic():
+        removed = delete_links(model, user, target_ids)
+        apply_side_effects(model, user, removed, -1)
+    return removed
+
+
+def bulk_add(model, user, target_ids):
+    _, _, target_model = BULK_MODELS[model]
+    with transaction.atomic():
+        found = set(
+            target_model.objects.filter(pk__in=target_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        allowed = [
+            pk
+            for pk in target_ids
+            if pk in found and not (model is Subscription and pk == user.id)
+        ]
+        added = insert_links(model, user, allowed)
+        apply_side_effects(model, user, added, 1)
+    added = set(added)
+    results = []
+    for pk in target_ids:
+        if pk not in found:
+            outcome = "not_found"
+        elif model is Subscription and pk == user.id:
+            outcome = "self"
+        elif pk in added:
+            outcome = "added"
+        else:
+            outcome = "exists"
+        results.append({"id": pk, "status": outcome})
+    return results
+
+
+def bulk_remove(model, user, target_ids):
+    removed = set(remove_links(model, user, target_ids))
+    return [
+        {"id": pk, "status": "removed" if pk in removed else "absent"}
+        for pk in target_ids
+    ]
+
+
+def clear_shopping_cart(user):
+    with transaction.atomic():
+        recipe_ids = delete_links(ShoppingCart, user)
+        update_counters(
+            ShoppingCart,
+            [ShoppingCart(recipe_id=pk) for pk in recipe_ids],
+            -1,
+        )
+        ShoppingListItem.objects.filter(user=user).delete()
+        if recipe_ids:
+            bump_user_versions([user.id])
+    return recipe_ids
@@ -0,0 +1,202 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from food.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+)
+from food.signals import bulk_loaded
+from food.timestamps import author_fields_changed
+from users.models import User
+
+VERSION_KEY = "api:content-version"
+TAGS_VERSION_KEY = "api:tags-version"
+INGREDIENTS_VERSION_KEY = "api:ingredients-version"
+# Счётчики попаданий приблизительные: incr файлового кэша не атомарен
+# между процессами, и одновременные запросы могут потерять инкремент.
+HITS_KEY = "api:cache-hits"
+MISSES_KEY = "api:cache-misses"
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def increment(key, initial=0):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, None)
+        return cache.incr(key)
+
+
+def get_user_version_key(user_id):
+    # Версия избранного, корзины и подписок пользователя.
+    return f"api:user-version:{user_id}"
+
+
+def increment_version(key=VERSION_KEY):
+    # Начальное значение от времени, чтобы после вытеснения ключа
+    # версия не совпала с одной из прежних.
+    return increment(key, time.time_ns())
+
+
+def get_version(key):
+    version = get_cache().get(key)
+    if version is None:
+        version = increment_version(key)
+    return version
+
+
+def get_content_version():
+    return get_version(VERSION_KEY)
+
+
+def bump_content_version():
+    transaction.on_commit(increment_version)
+
+
+def bump_versions(keys):
+    keys = set(keys)
+
+    def increment_all():
+        for key in keys:
+            increment_version(key)
+
+    transaction.on_commit(increment_all)
+
+
+def bump_user_versions(user_ids):
+    bump_versions(get_user_version_key(user_id) for user_id in user_ids)
+
+
+def get_cache_stats():
+    cache = get_cache()
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+        "version": cache.get(VERSION_KEY),
+    }
+
+
+def make_response_key(request, basename, action, kwargs):
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    raw = repr(
+        (
+            request.get_host(),
+            basename,
+            action,
+            sorted(kwargs.items()),
+            params,
+        )
+    )
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"api:response:{get_content_version()}:{digest}"
+
+
+class AnonymousResponseCacheMixin:
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = make_response_key(request, self.basename, self.action, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            increment(HITS_KEY)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        increment(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_responses(sender, **kwargs):
+    bump_content_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    bump_versions([TAGS_VERSION_KEY])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    bump_versions([INGREDIENTS_VERSION_KEY])
+
+
+@receiver(bulk_loaded, sender=Ingredient)
+def invalidate_loaded_ingredients(sender, **kwargs):
+    bump_versions([INGREDIENTS_VERSION_KEY, VERSION_KEY])
+
+
+@receiver(bulk_loaded, sender=Recipe)
+def invalidate_loaded_recipes(sender, **kwargs):
+    bump_content_version()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_recipes(sender, instance, **kwargs):
+    bump_user_versions([instance.author_id])
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user_subscriptions(sender, instance, **kwargs):
+    bump_user_versions([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_responses(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if author_fields_changed(instance, created, update_fields):
+        bump_content_version()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author(sender, **kwargs):
+    bump_content_version()
@@ -0,0 +1,97 @@
+import gzip
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from food.models import Ingredient, Tag
+from .cache import INGREDIENTS_VERSION_KEY, TAGS_VERSION_KEY, get_version
+from .serializers import IngredientSerializer, TagSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def compress(raw):
+    blobs = {"gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        blobs["br"] = brotli.compress(raw, quality=11)
+    blobs["identity"] = raw
+    return blobs
+
+
+def get_accepted_encodings(request):
+    encodings = set()
+    for item in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00"):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+class Catalog:
+    # Справочник целиком, сериализованный в JSON и сжатый заранее.
+    # Версия берётся из общего кэша API, поэтому после изменения
+    # тега или ингредиента каждый воркер пересобирает свою копию.
+
+    def __init__(self, name, version_key, get_data):
+        self.name = name
+        self.version_key = version_key
+        self.get_data = get_data
+        self._lock = threading.Lock()
+        self._compiled = (None, None)
+
+    def get_blobs(self):
+        # Версия читается до запроса к базе: если данные изменятся
+        # во время сборки, следующий запрос увидит новую версию.
+        version = get_version(self.version_key)
+        if self._compiled[0] != version:
+            with self._lock:
+                if self._compiled[0] != version:
+                    raw = JSONRenderer().render(self.get_data())
+                    self._compiled = (version, compress(raw))
+        return self._compiled
+
+    def response(self, request):
+        version, blobs = self.get_blobs()
+        accepted = get_accepted_encodings(request)
+        encoding = next(
+            (
+                name
+                for name in ("br", "gzip")
+                if name in accepted and name in blobs
+            ),
+            "identity",
+        )
+        etag = quote_etag(f"{self.name}-{version}-{encoding}")
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                blobs[encoding], content_type="application/json"
+            )
+            if encoding != "identity":
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+tag_catalog = Catalog(
+    "tags",
+    TAGS_VERSION_KEY,
+    lambda: TagSerializer(Tag.objects.order_by("id"), many=True).data,
+)
+ingredient_catalog = Catalog(
+    "ingredients",
+    INGREDIENTS_VERSION_KEY,
+    lambda: IngredientSerializer(
+        Ingredient.objects.order_by("id"), many=True
+    ).data,
+)
@@ -0,0 +1,70 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_user_version_key, get_version
+
+
+def make_etag(request, *parts):
+    # Тело ответа зависит ещё от адреса, параметров и формата.
+    raw = repr(
+        (
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            parts,
+        )
+    )
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    # get_validators возвращает (etag_parts, last_modified) или None,
+    # если валидаторы посчитать нельзя. Для авторизованного
+    # пользователя в ETag входит версия его избранного, корзины и
+    # подписок, а Last-Modified не отдаётся: он этих флагов не видит.
+
+    def get_validators(self, request):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        parts, last_modified = validators
+        if request.user.is_authenticated:
+            parts = (
+                *parts,
+                get_version(get_user_version_key(request.user.pk)),
+            )
+            last_modified = None
+        etag = make_etag(request, *parts)
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        response["Cache-Control"] = "no-cache"
+        patch_vary_headers(response, ("Authorization",))
+        return response
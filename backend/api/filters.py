@@ -0,0 +1,69 @@
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+from food.models import Favorite, Recipe, ShoppingCart
+from food.search import search_recipes
+
+TRUE_VALUES = ("1", "true")
+FALSE_VALUES = ("0", "false")
+
+
+class RecipeFilterBackend(BaseFilterBackend):
+    # Фильтры по связанным таблицам строятся как EXISTS (подзапрос):
+    # строки рецептов не размножаются соединениями, и DISTINCT
+    # по всем колонкам рецепта не нужен. Подзапросы идут по
+    # уникальным индексам связей (рецепт, тег) и (автор, рецепт).
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        user = request.user
+
+        author = params.get("author")
+        if author:
+            try:
+                queryset = queryset.filter(author_id=int(author))
+            except ValueError:
+                raise ValidationError({"author": ["Введите число."]})
+
+        tags = params.getlist("tags")
+        if tags:
+            queryset = queryset.filter(
+                Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe_id=OuterRef("pk"), tag__slug__in=tags
+                    )
+                )
+            )
+
+        for param, model in (
+            ("is_favorited", Favorite),
+            ("is_in_shopping_cart", ShoppingCart),
+        ):
+            value = params.get(param, "").lower()
+            if value not in TRUE_VALUES + FALSE_VALUES:
+                continue
+            if not user.is_authenticated:
+                if value in TRUE_VALUES:
+                    queryset = queryset.none()
+                continue
+            linked = Exists(
+                model.objects.filter(author=user, recipe_id=OuterRef("pk"))
+            )
+            if value in TRUE_VALUES:
+                queryset = queryset.filter(linked)
+            else:
+                queryset = queryset.exclude(linked)
+        return queryset
+
+
+class RecipeSearchFilter(SearchFilter):
+    # Полнотекстовый поиск по названию, описанию и ингредиентам.
+    # Без явного ordering найденные рецепты идут по релевантности.
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        searched = search_recipes(queryset, text)
+        if searched is queryset:
+            return queryset
+        return searched.order_by("-search_rank", "name", "id")
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from heapq import nsmallest
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from food.models import Ingredient
+from food.signals import bulk_loaded
+from .cache import INGREDIENTS_VERSION_KEY, get_version
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientIndex:
+    # Индекс собирается при старте воркера и сразу после изменения
+    # справочника в этом процессе. Изменения в других процессах
+    # видны по версии в общем кэше, которая читается не чаще раза
+    # в INGREDIENT_INDEX_VERSION_INTERVAL секунд. Устаревший индекс
+    # пересобирается в фоне, а поиск до тех пор идёт по прежней копии.
+
+    def __init__(self, ttl=None, limit=None, interval=None):
+        self.ttl = ttl if ttl is not None else getattr(
+            settings, "INGREDIENT_INDEX_TTL", 300
+        )
+        self.limit = limit if limit is not None else getattr(
+            settings, "INGREDIENT_SEARCH_LIMIT", 50
+        )
+        self.interval = interval if interval is not None else getattr(
+            settings, "INGREDIENT_INDEX_VERSION_INTERVAL", 5
+        )
+        self._lock = threading.Lock()
+        # Версия справочника, время сборки и данные меняются одним
+        # присваиванием, поэтому поиск всегда видит согласованную копию.
+        self._built = (None, 0, None)
+        self._checked_at = 0
+        self._stale = False
+        self._rebuild_pending = False
+
+    def clear(self):
+        with self._lock:
+            self._built = (None, 0, None)
+            self._checked_at = 0
+            self._stale = False
+            self._rebuild_pending = False
+
+    def invalidate(self):
+        # Данные не удаляются: идущий поиск дочитает прежнюю копию.
+        # До фиксации транзакции индекс пересоберёт первый поиск,
+        # после - сам процесс, который изменил справочник.
+        self._stale = True
+        if not self._rebuild_pending:
+            self._rebuild_pending = True
+            transaction.on_commit(self.rebuild)
+
+    def warm(self):
+        # Вызывается при старте воркера: база может быть ещё
+        # недоступна, тогда индекс соберёт первый поиск.
+        try:
+            self.rebuild()
+        except DatabaseError:
+            logger.warning("Индекс ингредиентов не собран при старте.")
+        finally:
+            connection.close()
+
+    def rebuild(self):
+        with self._lock:
+            self.build(get_version(INGREDIENTS_VERSION_KEY))
+
+    def refresh_in_background(self, version):
+        if not self._lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build(version)
+            except Exception:
+                logger.exception("Не удалось пересобрать индекс ингредиентов")
+            finally:
+                self._lock.release()
+                connection.close()
+
+        threading.Thread(
+            target=run, name="ingredient-index", daemon=True
+        ).start()
+
+    def build(self, version):
+        self._stale = False
+        self._rebuild_pending = False
+        rows = Ingredient.objects.annotate(
+            usage=Count("recipe_ingredients")
+        ).values_list("id", "name", "measurement_unit", "usage")
+        entries = sorted(
+            (name.lower(), -usage, name, pk, unit)
+            for pk, name, unit, usage in rows
+        )
+        keys = [key for key, *_ in entries]
+        ranks = [(usage, name) for _, usage, name, _, _ in entries]
+        items = [
+            {"id": pk, "name": name, "measurement_unit": unit}
+            for _, _, name, pk, unit in entries
+        ]
+        now = time.monotonic()
+        self._built = (version, now, (keys, ranks, items))
+        self._checked_at = now
+
+    def get_data(self):
+        if self._built[2] is None or self._stale:
+            with self._lock:
+                if self._built[2] is None or self._stale:
+                    self.build(get_version(INGREDIENTS_VERSION_KEY))
+            return self._built[2]
+
+        built_version, built_at, data = self._built
+        now = time.monotonic()
+        if now - self._checked_at >= self.interval:
+            self._checked_at = now
+            version = get_version(INGREDIENTS_VERSION_KEY)
+            if version != built_version or now - built_at > self.ttl:
+                self.refresh_in_background(version)
+        return data
+
+    def search(self, query, limit=None):
+        keys, ranks, items = self.get_data()
+        limit = limit or self.limit
+        query = query.lower()
+
+        # Совпадения по началу названия идут первыми, затем
+        # по подстроке; внутри группы - по частоте использования.
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + "\uffff", lo=start)
+        found = nsmallest(limit, range(start, end), key=ranks.__getitem__)
+        if len(found) < limit:
+            substring = (
+                position
+                for position in range(len(keys))
+                if not start <= position < end and query in keys[position]
+            )
+            found += nsmallest(
+                limit - len(found), substring, key=ranks.__getitem__
+            )
+        return [items[position] for position in found]
+
+
+ingredient_index = IngredientIndex()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(bulk_loaded, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
@@ -0,0 +1,233 @@
+import http.client
+import json
+import random
+import re
+import time
+from collections import namedtuple
+from urllib.parse import quote, urlsplit
+
+PostmanRequest = namedtuple(
+    "PostmanRequest", ["method", "path", "body", "token", "stores"]
+)
+Sample = namedtuple("Sample", ["label", "status", "duration"])
+
+VARIABLE = re.compile(r"\{\{(\w+)\}\}")
+STORED_VARIABLE = re.compile(r'collectionVariables\.set\("(\w+)"')
+
+# Сценарий, его доля в трафике и запросы из коллекции Postman.
+SCENARIOS = [
+    (
+        "Анонимный просмотр",
+        40,
+        [
+            "get_recipes_list // No Auth",
+            "get_recipe_detail // No Auth",
+            "get_tag_list // No Auth",
+            "get_recipe_short_link // No Auth",
+        ],
+    ),
+    (
+        "Просмотр с фильтрами",
+        25,
+        [
+            "get_recipes_list // User",
+            "get_recipes_list_with_two_tags_param // User",
+            "get_recipes_list_with_author_param // User",
+            "get_recipes_list_with_is_favorited_param // User",
+            "get_subscription_list_with_recipes_limit_param // User",
+            "get_ingredients_list_with_name_filter // User",
+        ],
+    ),
+    (
+        "Избранное",
+        12,
+        [
+            "add_to_favorite // User",
+            "get_recipes_list_with_is_favorited_param // User",
+            "remove_from_favorite // User",
+        ],
+    ),
+    (
+        "Корзина",
+        12,
+        [
+            "add_to_shopping_cart // User",
+            "get_recipes_list_with_is_in_shopping_cart_param // User",
+            "remove_from_shopping_cart // User",
+        ],
+    ),
+    (
+        "Скачивание списка покупок",
+        6,
+        [
+            "add_to_shopping_cart // User",
+            "download_shopping_cart // User",
+            "remove_from_shopping_cart // User",
+        ],
+    ),
+    (
+        "Создание рецепта",
+        5,
+        [
+            "create_first_recipe // Second User",
+            "delete_first_recipe // Second User",
+        ],
+    ),
+]
+
+
+def get_token(auth):
+    if not auth or auth.get("type") != "apikey":
+        return None
+    values = {item["key"]: item["value"] for item in auth["apikey"]}
+    return values.get("value")
+
+
+def load_collection(path):
+    # Запросы ищутся по имени; папки с некорректными запросами
+    # пропускаются, а авторизация наследуется от родительской папки.
+    with open(path, encoding="utf-8") as file:
+        collection = json.load(file)
+    variables = {
+        item["key"]: item["value"] for item in collection.get("variable", [])
+    }
+    requests = {}
+
+    def walk(items, token, bad):
+        for item in items:
+            auth = item.get("auth") or item.get("request", {}).get("auth")
+            item_token = get_token(auth) if auth else token
+            if "item" in item:
+                walk(
+                    item["item"],
+                    item_token,
+                    bad or "bad_requests" in item["name"],
+                )
+                continue
+            if bad or item["name"] in requests:
+                continue
+            request = item["request"]
+            url = request["url"]
+            raw = url["raw"] if isinstance(url, dict) else url
+            scripts = "\n".join(
+                line
+                for event in item.get("event", [])
+                for line in event.get("script", {}).get("exec", [])
+            )
+            requests[item["name"]] = PostmanRequest(
+                request["method"],
+                raw.replace("{{baseUrl}}", ""),
+                request.get("body", {}).get("raw"),
+                item_token,
+                STORED_VARIABLE.findall(scripts),
+            )
+
+    walk(collection["item"], None, False)
+    return requests, variables
+
+
+def substitute(template, variables, quote_values=False):
+    def replace(match):
+        value = str(variables[match.group(1)])
+        return quote(value) if quote_values else value
+
+    return VARIABLE.sub(replace, template)
+
+
+class VirtualUser:
+    def __init__(self, base_url, requests, variables, pools, seed):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80, timeout=30
+        )
+        self.requests = requests
+        self.variables = variables
+        self.pools = pools
+        self.rng = random.Random(seed)
+        self.samples = []
+
+    def start_scenario(self):
+        pools = self.pools
+        first, second = self.rng.sample(pools["ingredients"], 2)
+        self.variables.update(
+            firstRecipeId=self.rng.choice(pools["recipes"]),
+            userId=self.rng.choice(pools["authors"]),
+            firstIndredientId=first[0],
+            secondIndredientId=second[0],
+            ingredientNameFirstLatter=first[1][:1],
+        )
+
+    def run(self, deadline):
+        names = [scenario[0] for scenario in SCENARIOS]
+        weights = [scenario[1] for scenario in SCENARIOS]
+        steps = {scenario[0]: scenario[2] for scenario in SCENARIOS}
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            self.start_scenario()
+            for name in steps[scenario]:
+                self.send(self.requests[name])
+        self.connection.close()
+
+    def send(self, request):
+        path = substitute(request.path, self.variables, quote_values=True)
+        headers = {"Content-Type": "application/json"}
+        if request.token:
+            headers["Authorization"] = substitute(
+                request.token, self.variables
+            )
+        body = None
+        if request.body:
+            body = substitute(request.body, self.variables).encode()
+        label = f"{request.method} {request.path}"
+        started = time.perf_counter()
+        try:
+            self.connection.request(
+                request.method, path, body=body, headers=headers
+            )
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.samples.append(Sample(label, 0, 0))
+            return
+        self.samples.append(
+            Sample(label, status, time.perf_counter() - started)
+        )
+        if request.stores and status == 201:
+            recipe_id = json.loads(content).get("id")
+            for variable in request.stores:
+                self.variables[variable] = recipe_id
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(samples, elapsed):
+    by_label = {}
+    for sample in samples:
+        by_label.setdefault(sample.label, []).append(sample)
+    rows = []
+    for label, items in sorted(by_label.items()):
+        durations = [
+            item.duration * 1000 for item in items if item.status
+        ] or [0]
+        rows.append(
+            {
+                "label": label,
+                "count": len(items),
+                "rps": len(items) / elapsed,
+                "p50": percentile(durations, 0.5),
+                "p95": percentile(durations, 0.95),
+                "p99": percentile(durations, 0.99),
+                "client_errors": sum(
+                    400 <= item.status < 500 for item in items
+                ) / len(items),
+                "errors": sum(
+                    item.status == 0 or item.status >= 500 for item in items
+                ) / len(items),
+            }
+        )
+    return rows
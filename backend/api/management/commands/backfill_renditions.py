@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.renditions import RENDITION_FIELDS, render_image, store_renditions
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные версии уже загруженных изображений."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать версии даже для обработанных изображений.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        # Дочерние процессы работают только с хранилищем, а соединения
+        # с БД не должны достаться им при fork.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            for model, field, renditions_field in RENDITION_FIELDS:
+                done, failed = self.backfill(
+                    executor,
+                    workers * 4,
+                    model,
+                    field,
+                    renditions_field,
+                    options,
+                )
+                self.stdout.write(
+                    f"{model.__name__}.{field}: обработано {done}, "
+                    f"ошибок {failed}."
+                )
+        self.stdout.write(self.style.SUCCESS("Готово."))
+
+    def backfill(
+        self, executor, max_pending, model, field, renditions_field, options
+    ):
+        pending = {}
+        done = failed = 0
+
+        def collect(return_when):
+            nonlocal done, failed
+            finished, _ = wait(pending, return_when=return_when)
+            for future in finished:
+                pk = pending.pop(future)
+                try:
+                    renditions = future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {pk}: {error}")
+                    continue
+                store_renditions(
+                    model, pk, field, renditions_field, renditions
+                )
+                done += 1
+
+        rows = model.objects.order_by("pk").values_list(
+            "pk", field, renditions_field
+        )
+        last_pk = 0
+        while True:
+            batch = list(
+                rows.filter(pk__gt=last_pk)[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name, renditions in batch:
+                if not name:
+                    continue
+                if not options["force"] and renditions.get("source") == name:
+                    continue
+                if len(pending) >= max_pending:
+                    collect(FIRST_COMPLETED)
+                pending[executor.submit(render_image, name)] = pk
+        if pending:
+            collect(ALL_COMPLETED)
+        return done, failed
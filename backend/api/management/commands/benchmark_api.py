@@ -0,0 +1,143 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.benchmarks import ROUTES, RouteRunner, build_context
+from api.cache import increment_version
+from food.models import Recipe
+from users.models import User
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет время ответа и число SQL-запросов для маршрутов API "
+        "на текущих данных."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--user", help="Email пользователя для замеров.")
+        parser.add_argument(
+            "--routes",
+            nargs="*",
+            help="Замерять только маршруты, содержащие эти строки.",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Сбрасывать кэш анонимных ответов перед каждым запросом.",
+        )
+        parser.add_argument("--output", help="Сохранить результаты в JSON.")
+        parser.add_argument(
+            "--baseline",
+            help="Сравнить с сохранённым JSON и упасть при регрессии.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимый рост медианы времени относительно baseline.",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError("Пользователь не найден.")
+        context = build_context(user)
+        if context is None:
+            raise CommandError(
+                "Недостаточно данных, запустите generate_dataset."
+            )
+        routes = [
+            route
+            for route in ROUTES
+            if not options["routes"]
+            or any(part in route.name for part in options["routes"])
+        ]
+
+        samples = {}
+        # Все изменения откатываются, база остаётся как была.
+        with transaction.atomic():
+            runner = RouteRunner(context)
+            for iteration in range(options["warmup"] + options["iterations"]):
+                for route in routes:
+                    if not runner.is_available(route):
+                        continue
+                    if options["cold"] and not route.auth:
+                        increment_version()
+                    result = runner.run(route)
+                    if iteration < options["warmup"]:
+                        continue
+                    samples.setdefault(
+                        f"{route.method.upper()} {route.name}", []
+                    ).append(result)
+            transaction.set_rollback(True)
+
+        report = {
+            "recipes": Recipe.objects.count(),
+            "users": User.objects.count(),
+            "routes": {},
+        }
+        self.stdout.write(
+            f"Рецептов: {report['recipes']}, "
+            f"пользователей: {report['users']}."
+        )
+        self.stdout.write(
+            f"{'маршрут':48} {'код':>5} {'SQL':>4} {'p50, мс':>9} "
+            f"{'p95, мс':>9}"
+        )
+        for key, results in samples.items():
+            durations = [result.duration * 1000 for result in results]
+            stats = {
+                "status": statistics.mode(
+                    result.status for result in results
+                ),
+                "queries": max(len(result.queries) for result in results),
+                "p50": round(statistics.median(durations), 2),
+                "p95": round(percentile(durations, 0.95), 2),
+            }
+            report["routes"][key] = stats
+            self.stdout.write(
+                f"{key:48} {stats['status']:>5} {stats['queries']:>4} "
+                f"{stats['p50']:>9.2f} {stats['p95']:>9.2f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options["baseline"]:
+            self.compare(report, options["baseline"], options["tolerance"])
+
+    def compare(self, report, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)["routes"]
+        regressions = []
+        for key, stats in report["routes"].items():
+            expected = baseline.get(key)
+            if expected is None:
+                continue
+            if stats["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{key}: SQL-запросов {stats['queries']} "
+                    f"вместо {expected['queries']}"
+                )
+            if stats["p50"] > expected["p50"] * (1 + tolerance):
+                regressions.append(
+                    f"{key}: медиана {stats['p50']} мс "
+                    f"вместо {expected['p50']} мс"
+                )
+        if regressions:
+            raise CommandError(
+                "Найдены регрессии:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("Регрессий нет."))
@@ -0,0 +1,161 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.renditions import RENDITION_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни один "
+        "рецепт или пользователь."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Не трогать файлы, изменённые позже этого срока.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только вывести найденные файлы.",
+        )
+        parser.add_argument(
+            "--quarantine",
+            help="Переносить файлы в этот каталог вместо удаления.",
+        )
+        parser.add_argument(
+            "--state-file",
+            default=os.path.join(settings.MEDIA_ROOT, ".gc-checkpoint"),
+            help="Файл с последним обработанным путём для продолжения.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать обход заново, не читая сохранённую позицию.",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options["quarantine"]:
+            options["quarantine"] = os.path.abspath(options["quarantine"])
+        self.root = os.path.abspath(settings.MEDIA_ROOT)
+        self.deadline = time.time() - options["grace_hours"] * 3600
+        self.checked = self.removed = self.freed = 0
+
+        checkpoint = None
+        if not options["restart"] and not options["dry_run"]:
+            checkpoint = self.read_checkpoint()
+        if checkpoint:
+            self.stdout.write(f"Продолжение после {'/'.join(checkpoint)}.")
+
+        batch = []
+        for name, size in self.walk(self.root, [], checkpoint):
+            batch.append((name, size))
+            if len(batch) >= options["batch_size"]:
+                self.process(batch)
+                batch = []
+        if batch:
+            self.process(batch)
+        if not options["dry_run"] and os.path.exists(options["state_file"]):
+            os.remove(options["state_file"])
+
+        action = "найдено" if options["dry_run"] else "удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено {self.checked}, {action} {self.removed} "
+                f"({self.freed} байт)."
+            )
+        )
+
+    def walk(self, path, parts, checkpoint):
+        # Записи каталога сортируются, чтобы порядок обхода был
+        # одинаковым между запусками и его можно было продолжить.
+        # В памяти одновременно находится только один каталог на
+        # каждом уровне вложенности.
+        with os.scandir(path) as iterator:
+            entries = sorted(
+                (entry for entry in iterator
+                 if not entry.name.startswith(".")),
+                key=lambda entry: entry.name,
+            )
+        for entry in entries:
+            entry_parts = parts + [entry.name]
+            if entry.is_dir(follow_symlinks=False):
+                if checkpoint and entry_parts < checkpoint[:len(entry_parts)]:
+                    continue
+                if entry.path == self.options["quarantine"]:
+                    continue
+                yield from self.walk(entry.path, entry_parts, checkpoint)
+            elif entry.is_file(follow_symlinks=False):
+                if checkpoint and entry_parts <= checkpoint:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime < self.deadline:
+                    yield "/".join(entry_parts), stat.st_size
+
+    def process(self, batch):
+        names = [name for name, size in batch]
+        referenced = self.get_referenced(names)
+        for name, size in batch:
+            self.checked += 1
+            if name in referenced:
+                continue
+            path = os.path.join(self.root, name)
+            if self.options["dry_run"]:
+                self.stdout.write(name)
+            elif not self.remove(name, path):
+                continue
+            self.removed += 1
+            self.freed += size
+        if not self.options["dry_run"]:
+            self.write_checkpoint(names[-1])
+
+    def get_referenced(self, names):
+        referenced = set()
+        for model, field, renditions_field in RENDITION_FIELDS:
+            condition = Q(**{f"{field}__in": names})
+            for label in settings.IMAGE_RENDITIONS:
+                condition |= Q(**{f"{renditions_field}__{label}__in": names})
+            for row in model.objects.filter(condition).values(
+                field, renditions_field
+            ):
+                referenced.add(row[field])
+                referenced.update(row[renditions_field].values())
+        return referenced
+
+    def remove(self, name, path):
+        try:
+            # Файл мог получить новую ссылку, пока шла проверка.
+            if os.stat(path).st_mtime >= self.deadline:
+                return False
+            if self.options["quarantine"]:
+                os.renames(
+                    path, os.path.join(self.options["quarantine"], name)
+                )
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def read_checkpoint(self):
+        try:
+            with open(self.options["state_file"]) as file:
+                name = file.read().strip()
+        except FileNotFoundError:
+            return None
+        return name.split("/") if name else None
+
+    def write_checkpoint(self, name):
+        temp_path = self.options["state_file"] + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(name)
+        os.replace(temp_path, self.options["state_file"])
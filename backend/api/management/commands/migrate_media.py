@@ -0,0 +1,83 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from api.authentication import forget_user
+from api.cache import bump_content_version
+from api.renditions import RENDITION_FIELDS
+from api.storage import ContentAddressedStorage, is_content_addressed
+from food.timestamps import update_image_fields
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит загруженные ранее файлы в хранилище с именами "
+        "по хэшу содержимого."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--delete-old",
+            action="store_true",
+            help="Удалить исходные файлы после переноса.",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError(
+                "DEFAULT_FILE_STORAGE не является ContentAddressedStorage."
+            )
+        for model, field, renditions_field in RENDITION_FIELDS:
+            moved, missing = self.migrate(
+                model, field, renditions_field, options
+            )
+            self.stdout.write(
+                f"{model.__name__}.{field}: перенесено {moved}, "
+                f"не найдено {missing}."
+            )
+        bump_content_version()
+        self.stdout.write(self.style.SUCCESS("Готово."))
+
+    def migrate(self, model, field, renditions_field, options):
+        moved = missing = 0
+        rows = model.objects.order_by("pk").values_list(
+            "pk", field, renditions_field
+        )
+        last_pk = 0
+        while True:
+            batch = list(
+                rows.filter(pk__gt=last_pk)[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name, renditions in batch:
+                if not name or is_content_addressed(name):
+                    continue
+                if not default_storage.exists(name):
+                    missing += 1
+                    self.stderr.write(
+                        f"{model.__name__} {pk}: нет файла {name}"
+                    )
+                    continue
+                with default_storage.open(name) as file:
+                    new_name = default_storage.save(name, file)
+                # Готовые версии изображения остаются действительными.
+                if renditions.get("source") == name:
+                    renditions["source"] = new_name
+                updated = update_image_fields(
+                    model,
+                    pk,
+                    {field: name},
+                    {field: new_name, renditions_field: renditions},
+                )
+                if updated:
+                    moved += 1
+                    if model is User:
+                        forget_user(pk)
+                    if options["delete_old"]:
+                        os.remove(default_storage.path(name))
+        return moved, missing
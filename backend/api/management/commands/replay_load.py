@@ -0,0 +1,198 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.load_replay import VirtualUser, load_collection, summarize
+from food.models import Ingredient, Recipe, Tag
+from users.models import User
+
+DEFAULT_COLLECTION = (
+    Path(settings.BASE_DIR).parent
+    / "postman_collection"
+    / "foodgram.postman_collection.json"
+)
+
+
+def wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Воспроизводит смешанный трафик из коллекции Postman против "
+        "запущенного gunicorn и выводит пропускную способность и "
+        "задержки по каждому эндпоинту."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=str(DEFAULT_COLLECTION))
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=30)
+        parser.add_argument(
+            "--url",
+            help="Адрес уже запущенного сервера; иначе запускается gunicorn.",
+        )
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--output", help="Сохранить результаты в JSON.")
+
+    def handle(self, *args, **options):
+        requests, variables = load_collection(options["collection"])
+        pools = self.get_pools(options["concurrency"])
+
+        server = None
+        base_url = options["url"]
+        if base_url is None:
+            server = self.start_server(options["workers"], options["port"])
+            base_url = f"http://127.0.0.1:{options['port']}"
+        try:
+            samples, elapsed = self.run_load(
+                base_url, requests, variables, pools, options
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+        rows = summarize(samples, elapsed)
+        self.report(rows, len(samples), elapsed)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "requests": len(samples),
+                        "elapsed": elapsed,
+                        "endpoints": rows,
+                    },
+                    file,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+
+    def get_pools(self, concurrency):
+        users = list(
+            User.objects.filter(is_active=True).order_by("pk")[:concurrency]
+        )
+        tags = list(Tag.objects.order_by("pk")[:3])
+        ingredients = list(
+            Ingredient.objects.order_by("pk").values_list("pk", "name")[:500]
+        )
+        recipes = list(
+            Recipe.objects.order_by("-favorites_count").values_list(
+                "pk", flat=True
+            )[:1000]
+        )
+        if len(users) < concurrency or len(tags) < 3 or not recipes:
+            raise CommandError(
+                "Недостаточно данных, запустите generate_dataset."
+            )
+        return {
+            "users": users,
+            "tags": tags,
+            "ingredients": ingredients,
+            "recipes": recipes,
+            "authors": list(
+                User.objects.order_by("-recipes_count").values_list(
+                    "pk", flat=True
+                )[:100]
+            ),
+        }
+
+    def start_server(self, workers, port):
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "backend.wsgi",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--chdir",
+            str(settings.BASE_DIR),
+            "--log-level",
+            "warning",
+        ]
+        server = subprocess.Popen(command, env=os.environ.copy())
+        if not wait_for_port("127.0.0.1", port, 30):
+            server.terminate()
+            raise CommandError(
+                "gunicorn не запустился; установите его или укажите --url."
+            )
+        return server
+
+    def run_load(self, base_url, requests, variables, pools, options):
+        tags = pools["tags"]
+        virtual_users = []
+        for number, user in enumerate(pools["users"]):
+            token, _ = Token.objects.get_or_create(user=user)
+            user_variables = dict(
+                variables,
+                userToken=token.key,
+                secondUserToken=token.key,
+                secondUserId=pools["authors"][0],
+                thirdUserId=pools["authors"][-1],
+                firstTagId=tags[0].pk,
+                secondTagId=tags[1].pk,
+                thirdTagId=tags[2].pk,
+                secondTagSlug=tags[1].slug,
+                thirdTagSlug=tags[2].slug,
+            )
+            seed = options["seed"]
+            if seed is not None:
+                seed += number
+            virtual_users.append(
+                VirtualUser(base_url, requests, user_variables, pools, seed)
+            )
+
+        started = time.monotonic()
+        deadline = started + options["duration"]
+        threads = [
+            threading.Thread(target=virtual_user.run, args=(deadline,))
+            for virtual_user in virtual_users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        samples = [
+            sample
+            for virtual_user in virtual_users
+            for sample in virtual_user.samples
+        ]
+        return samples, elapsed
+
+    def report(self, rows, total, elapsed):
+        self.stdout.write(
+            f"Запросов: {total} за {elapsed:.1f} с, "
+            f"{total / elapsed:.1f} запросов/с."
+        )
+        self.stdout.write(
+            f"{'эндпоинт':70} {'кол-во':>7} {'rps':>7} {'p50':>8} "
+            f"{'p95':>8} {'p99':>8} {'4xx':>6} {'ошибки':>7}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['label'][:70]:70} {row['count']:>7} "
+                f"{row['rps']:>7.1f} {row['p50']:>8.1f} {row['p95']:>8.1f} "
+                f"{row['p99']:>8.1f} {row['client_errors']:>6.1%} "
+                f"{row['errors']:>7.1%}"
+            )
@@ -0,0 +1,235 @@
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import get_cache_stats
+
+PREFIX = "foodgram"
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HISTOGRAMS = {
+    "request_duration_seconds": ("Время обработки запроса.", SECONDS),
+    "db_duration_seconds": ("Время SQL-запросов.", SECONDS),
+    "encode_duration_seconds": (
+        "Время кодирования готовых данных ответа в JSON или другой формат.",
+        SECONDS,
+    ),
+    "db_queries": (
+        "Количество SQL-запросов.",
+        (0, 1, 2, 5, 10, 20, 50, 100, 200),
+    ),
+    "response_size_bytes": (
+        "Размер ответа.",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+
+def is_alive(path):
+    # Файлы завершившихся воркеров удаляются: их гистограммы иначе
+    # копились бы в METRICS_DIR бесконечно.
+    try:
+        pid = int(os.path.basename(path).split(".")[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Histograms:
+    # Каждый процесс копит гистограммы в памяти и периодически
+    # сбрасывает их в свой файл в METRICS_DIR. Эндпоинт метрик
+    # складывает файлы всех процессов, поэтому числа не зависят от
+    # того, какой воркер gunicorn принял запрос.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def reset(self):
+        # После fork каждый процесс получает собственный файл. Новый
+        # процесс с тем же pid перезаписывает файл завершившегося.
+        self.pid = os.getpid()
+        self.data = {}
+        self.flushed_at = 0
+        self.path = os.path.join(settings.METRICS_DIR, f"{self.pid}.json")
+
+    def observe(self, route, method, values):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            for metric, value in values.items():
+                bounds = HISTOGRAMS[metric][1]
+                entry = self.data.setdefault(
+                    f"{metric}|{route}|{method}",
+                    {"buckets": [0] * len(bounds), "sum": 0, "count": 0},
+                )
+                for index, bound in enumerate(bounds):
+                    if value <= bound:
+                        entry["buckets"][index] += 1
+                        break
+                entry["sum"] += value
+                entry["count"] += 1
+        self.flush()
+
+    def flush(self, force=False):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            now = time.monotonic()
+            if not force and (
+                now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed_at = now
+            content = json.dumps(self.data)
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(content)
+        os.replace(temp_path, self.path)
+
+    def collect(self):
+        self.flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json")):
+            if not is_alive(path):
+                remove_file(path)
+                continue
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for key, entry in data.items():
+                total = merged.setdefault(
+                    key,
+                    {
+                        "buckets": [0] * len(entry["buckets"]),
+                        "sum": 0,
+                        "count": 0,
+                    },
+                )
+                for index, count in enumerate(entry["buckets"]):
+                    total["buckets"][index] += count
+                total["sum"] += entry["sum"]
+                total["count"] += entry["count"]
+        return merged
+
+
+histograms = Histograms()
+
+
+def render_metrics():
+    merged = histograms.collect()
+    lines = []
+    for metric, (description, bounds) in HISTOGRAMS.items():
+        name = f"{PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for key in sorted(merged):
+            key_metric, route, method = key.split("|")
+            if key_metric != metric:
+                continue
+            entry = merged[key]
+            labels = f'route="{route}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(bounds, entry["buckets"]):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{name}_bucket{{{labels},le="+Inf"}} {entry["count"]}'
+            )
+            lines.append(f"{name}_sum{{{labels}}} {entry['sum']}")
+            lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+
+    stats = get_cache_stats()
+    for counter in ("hits", "misses"):
+        name = f"{PREFIX}_api_cache_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {stats[counter]}")
+    return "\n".join(lines) + "\n"
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        encode = getattr(request, "metrics_encode_duration", 0)
+        app = max(duration - queries.duration - encode, 0)
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={queries.duration * 1000:.1f};'
+                f'desc="{queries.count} queries"',
+                f"encode;dur={encode * 1000:.1f}",
+                f"app;dur={app * 1000:.1f}",
+                f"total;dur={duration * 1000:.1f}",
+            ]
+        )
+
+        values = {
+            "request_duration_seconds": duration,
+            "db_duration_seconds": queries.duration,
+            "encode_duration_seconds": encode,
+            "db_queries": queries.count,
+        }
+        if not response.streaming:
+            values["response_size_bytes"] = len(response.content)
+        match = request.resolver_match
+        route = (match and match.url_name) or "unmatched"
+        histograms.observe(route, request.method, values)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после view. Сериализаторы к этому
+        # моменту уже отработали внутри view, поэтому здесь меряется
+        # только кодирование готовых данных рендерером.
+        started = time.perf_counter()
+
+        def finish(response):
+            request.metrics_encode_duration = time.perf_counter() - started
+
+        response.add_post_render_callback(finish)
+        return response
@@ -1,13 +1,153 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
 
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-class RecipePagination(PageNumberPagination):
+MAX_BIGINT = 2 ** 63 - 1
+
+
+class KeysetPagination(BasePagination):
+    # Следующая страница выбирается условием по полям сортировки
+    # последней записи, поэтому не нужны ни COUNT(*), ни OFFSET.
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 6
+    max_page_size = 100
+    ordering = ("id",)
+    # Типы значений полей ordering в курсоре.
+    ordering_types = (int,)
+    # Параметры, которые меняют порядок записей: курсор строится по
+    # ordering и с ними несовместим.
+    conflicting_params = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.check_params(request)
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        results = list(queryset[:self.page_size + 1])
+        self.next_position = None
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_position = [
+                getattr(results[-1], field) for field in self.ordering
+            ]
+        return results
+
+    def check_params(self, request):
+        errors = {
+            param: f"Нельзя использовать вместе с {self.cursor_query_param}."
+            for param in self.conflicting_params
+            if request.query_params.get(param)
+        }
+        if errors:
+            raise ValidationError(errors)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, position):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            step = Q(**{f"{field}__gt": position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound("Некорректный курсор.")
+        if not isinstance(position, list) or (
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound("Некорректный курсор.")
+        for value, value_type in zip(position, self.ordering_types):
+            # bool - подкласс int, а id не должен выходить за bigint.
+            if type(value) is not value_type or (
+                value_type is int and abs(value) > MAX_BIGINT
+            ):
+                raise NotFound("Некорректный курсор.")
+        return position
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            json.dumps(position, ensure_ascii=False).encode()
+        ).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    # Постраничный режим остаётся по умолчанию, а параметр cursor
+    # (в том числе пустой) включает пагинацию по ключу.
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipeKeysetPagination(KeysetPagination):
+    ordering = ("name", "id")
+    ordering_types = (str, int)
+    conflicting_params = ("ordering", "search")
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+    ordering = ("subscription_id",)
+
+
+class RecipePagination(OptionalKeysetPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
+    keyset_class = RecipeKeysetPagination
 
 
-class SubscriptionPagination(PageNumberPagination):
+class SubscriptionPagination(OptionalKeysetPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
+    keyset_class = SubscriptionKeysetPagination
@@ -0,0 +1,118 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, features
+
+from food.models import Recipe
+from food.timestamps import update_image_fields
+from users.models import User
+from .authentication import forget_user
+from .cache import bump_content_version
+
+logger = logging.getLogger(__name__)
+
+# Модель, поле с изображением и поле с путями к его версиям.
+RENDITION_FIELDS = [
+    (Recipe, "image", "image_renditions"),
+    (User, "avatar", "avatar_renditions"),
+]
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix="renditions",
+)
+
+
+def get_output_format():
+    return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+
+def render_image(name):
+    image_format, ext = get_output_format()
+    stem = os.path.splitext(os.path.basename(name))[0]
+    renditions = {"source": name}
+
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        mode = "RGBA" if image_format == "WEBP" else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+        for label, size in settings.IMAGE_RENDITIONS.items():
+            rendition = image.copy()
+            rendition.thumbnail(size)
+            buffer = io.BytesIO()
+            rendition.save(buffer, image_format, quality=80)
+            renditions[label] = default_storage.save(
+                f"renditions/{label}/{stem}.{ext}",
+                ContentFile(buffer.getvalue()),
+            )
+    return renditions
+
+
+def needs_renditions(field_file, renditions):
+    return bool(field_file) and renditions.get("source") != field_file.name
+
+
+def store_renditions(model, pk, field, renditions_field, renditions):
+    updated = update_image_fields(
+        model,
+        pk,
+        {field: renditions["source"]},
+        {renditions_field: renditions},
+    )
+    if updated:
+        bump_content_version()
+        if model is User:
+            forget_user(pk)
+
+
+def process_image(model, pk, field, renditions_field, name):
+    try:
+        renditions = render_image(name)
+        store_renditions(model, pk, field, renditions_field, renditions)
+    except Exception:
+        logger.exception("Не удалось обработать изображение %s", name)
+    finally:
+        connection.close()
+
+
+def get_rendition_urls(request, field_file, renditions):
+    if not field_file:
+        return None
+    build_url = request.build_absolute_uri if request else str
+    ready = renditions.get("source") == field_file.name and all(
+        label in renditions for label in settings.IMAGE_RENDITIONS
+    )
+    if not ready:
+        url = build_url(field_file.url)
+        return {label: url for label in settings.IMAGE_RENDITIONS}
+    return {
+        label: build_url(default_storage.url(renditions[label]))
+        for label in settings.IMAGE_RENDITIONS
+    }
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=User)
+def schedule_renditions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for model, field, renditions_field in RENDITION_FIELDS:
+        if model is not sender:
+            continue
+        field_file = getattr(instance, field)
+        if needs_renditions(field_file, getattr(instance, renditions_field)):
+            args = (
+                model, instance.pk, field, renditions_field, field_file.name
+            )
+            transaction.on_commit(
+                lambda args=args: executor.submit(process_image, *args)
+            )
@@ -1,7 +1,7 @@
-import base64
+import json
 
+from django.conf import settings
 from django.db import transaction
-from django.core.files.base import ContentFile
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
@@ -14,7 +14,24 @@ from food.models import (
     ShoppingCart,
     RecipeIngredient,
 )
+from food.shopping_list import replace_recipe_ingredients
 from users.models import User
+from .renditions import get_rendition_urls
+from .uploads import decode_base64_image
+
+
+def get_recipes_limit(request):
+    # Нечисловое значение, как и раньше, не ограничивает список, а
+    # отрицательное срез и LIMIT не принимают.
+    try:
+        recipes_limit = int(request.query_params["recipes_limit"])
+    except (KeyError, ValueError):
+        return None
+    if recipes_limit < 0:
+        raise serializers.ValidationError(
+            {"recipes_limit": "Значение не может быть отрицательным."}
+        )
+    return recipes_limit
 
 
 class Base64ImageField(serializers.ImageField):
@@ -24,14 +41,15 @@ class Base64ImageField(serializers.ImageField):
             return super().to_internal_value(data)
 
         if isinstance(data, str):
-            if data.startswith("data:image"):
-                format, imgstr = data.split(";base64,")
-                ext = format.split("/")[-1]
-                data = ContentFile(
-                    base64.b64decode(imgstr), name=f"temp.{ext}"
-                )
+            data = decode_base64_image(data, "temp")
 
-        return super().to_internal_value(data)
+        image = super().to_internal_value(data)
+        width, height = image.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                "Разрешение изображения слишком велико."
+            )
+        return image
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -102,6 +120,9 @@ class FavoriteRecipeSerializerNew(serializers.ModelSerializer):
                 else None
             ),
             "cooking_time": instance.cooking_time,
+            "image_renditions": get_rendition_urls(
+                request, instance.image, instance.image_renditions
+            ),
         }
 
 
@@ -150,10 +171,38 @@ class RecipeSerializer(serializers.ModelSerializer):
         representation["ingredients"] = IngredientSerializerNew(
             instance.recipe_ingredients.all(), many=True
         ).data
+        representation["image_renditions"] = get_rendition_urls(
+            request, instance.image, instance.image_renditions
+        )
         return representation
 
-    def create_recipe_ingredients(self, recipe, ingredients_data):
-        recipe_ingredients = [
+    def to_internal_value(self, data):
+        # В multipart/form-data теги передаются повторяющимся полем
+        # или JSON-списком, ингредиенты - JSON-списком.
+        if hasattr(data, "getlist"):
+            tags = data.getlist("tags")
+            if len(tags) == 1 and tags[0].startswith("["):
+                try:
+                    tags = json.loads(tags[0])
+                except ValueError:
+                    tags = None
+                if not isinstance(tags, list):
+                    raise serializers.ValidationError(
+                        {"tags": "Ожидается JSON-список."}
+                    )
+            data = data.dict()
+            data["tags"] = tags
+            if isinstance(data.get("ingredients"), str):
+                try:
+                    data["ingredients"] = json.loads(data["ingredients"])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {"ingredients": "Ожидается JSON-список."}
+                    )
+        return super().to_internal_value(data)
+
+    def get_recipe_ingredients(self, recipe, ingredients_data):
+        return [
             RecipeIngredient(
                 recipe=recipe,
                 ingredient_id=ingredient_data["ingredient"]["id"],
@@ -161,7 +210,6 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
             for ingredient_data in ingredients_data
         ]
-        RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
     def validate_ingredients(self, ingredients):
         if not ingredients:
@@ -218,7 +266,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags_data = validated_data.pop("tags", [])
 
         recipe = Recipe.objects.create(**validated_data)
-        self.create_recipe_ingredients(recipe, ingredients_data)
+        RecipeIngredient.objects.bulk_create(
+            self.get_recipe_ingredients(recipe, ingredients_data)
+        )
         recipe.tags.set(tags_data)
 
         return recipe
@@ -238,13 +288,16 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
 
         instance = super().update(instance, validated_data)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.create_recipe_ingredients(instance, ingredients_data)
+        replace_recipe_ingredients(
+            instance, self.get_recipe_ingredients(instance, ingredients_data)
+        )
         instance.tags.set(tags_data)
 
         return instance
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_recipe_favorited"):
+            return obj.is_recipe_favorited
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return Favorite.objects.filter(
@@ -253,6 +306,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_user_shopping_cart"):
+            return obj.is_in_user_shopping_cart
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return ShoppingCart.objects.filter(
@@ -274,10 +329,11 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeListSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "cooking_time", "image_renditions")
 
     def get_image(self, obj):
         request = self.context.get("request")
@@ -285,9 +341,19 @@ class RecipeListSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_renditions(self, obj):
+        return get_rendition_urls(
+            self.context.get("request"), obj.image, obj.image_renditions
+        )
+
+
+class AvatarSerializer(serializers.Serializer):
+    avatar = Base64ImageField()
+
 
 class UserSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
+    avatar_renditions = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -300,9 +366,12 @@ class UserSerializer(serializers.ModelSerializer):
             "last_name",
             "is_subscribed",
             "avatar",
+            "avatar_renditions",
         ]
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_user_subscribed"):
+            return obj.is_user_subscribed
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return Subscription.objects.filter(
@@ -316,6 +385,11 @@ class UserSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.avatar.url)
         return None
 
+    def get_avatar_renditions(self, obj):
+        return get_rendition_urls(
+            self.context.get("request"), obj.avatar, obj.avatar_renditions
+        )
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
 
@@ -325,20 +399,21 @@ class UserSerializer(serializers.ModelSerializer):
             "subscriptions" in request.path
             or "subscribe" in request.path
         ):
+            if hasattr(instance, "feed_recipes"):
+                representation["recipes"] = RecipeListSerializer(
+                    instance.feed_recipes, many=True, context=self.context
+                ).data
+                representation["recipes_count"] = instance.recipes_count
+                return representation
+
             recipes = Recipe.objects.filter(author=instance)
-            recipes_limit = request.query_params.get(
-                "recipes_limit", None
-            )
+            recipes_limit = get_recipes_limit(request)
             if recipes_limit is not None:
-                try:
-                    recipes_limit = int(recipes_limit)
-                    recipes = recipes[:recipes_limit]
-                except ValueError:
-                    pass
+                recipes = recipes[:recipes_limit]
             representation["recipes"] = RecipeListSerializer(
                 recipes, many=True, context=self.context
             ).data
-            representation["recipes_count"] = recipes.count()
+            representation["recipes_count"] = instance.recipes_count
 
         return representation
 
@@ -385,3 +460,14 @@ class SimpleRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ["id", "name", "image", "cooking_time"]
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_ACTION_LIMIT,
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
@@ -0,0 +1,104 @@
+import csv
+import tempfile
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from food.models import ShoppingListItem
+
+TITLE = "Ваш список покупок:"
+CSV_HEADER = ("Ингредиент", "Количество", "Единица измерения")
+
+
+class IgnoreFormatContentNegotiation(DefaultContentNegotiation):
+    # Параметр ?format= выбирает формат файла, а не рендерер DRF.
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def get_shopping_list(user):
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            ingredient_name=F("ingredient__name"),
+            ingredient_unit=F("ingredient__measurement_unit"),
+            total_amount=F("amount"),
+        )
+        .order_by("ingredient_name", "ingredient_unit")
+        .iterator(chunk_size=2000)
+    )
+
+
+def format_line(item):
+    return (
+        f"{item['ingredient_name']}: "
+        f"{item['total_amount']} {item['ingredient_unit']}"
+    )
+
+
+def render_txt(items):
+    yield f"{TITLE}\n"
+    for item in items:
+        yield f"{format_line(item)}\n"
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in items:
+        yield writer.writerow(
+            (
+                item["ingredient_name"],
+                item["total_amount"],
+                item["ingredient_unit"],
+            )
+        )
+
+
+def render_pdf(items):
+    # reportlab собирает документ целиком, поэтому PDF не передаётся
+    # по мере чтения строк: файл готовится заранее (в памяти до 1 МБ,
+    # дальше на диске) и отдаётся как обычный файл.
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    font = "ShoppingListFont"
+    if font not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(font, settings.SHOPPING_LIST_PDF_FONT)
+        )
+
+    file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    pdf = canvas.Canvas(file, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, height - margin, TITLE)
+    y = height - margin - line_height * 2
+    pdf.setFont(font, 12)
+    for item in items:
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - margin
+        pdf.drawString(margin, y, format_line(item))
+        y -= line_height
+    pdf.save()
+    file.seek(0)
+    return file
+
+
+SHOPPING_LIST_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", render_txt),
+    "csv": ("text/csv; charset=utf-8", render_csv),
+    "pdf": ("application/pdf", render_pdf),
+}
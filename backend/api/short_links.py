@@ -0,0 +1,57 @@
+import string
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from food.models import Recipe, ShortLink
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+# Наибольший id рецепта (bigint): длинные коды не доходят до базы.
+MAX_RECIPE_ID = 2 ** 63 - 1
+
+
+def encode_short_code(recipe_id):
+    code = ""
+    while True:
+        recipe_id, remainder = divmod(recipe_id, BASE)
+        code = ALPHABET[remainder] + code
+        if not recipe_id:
+            return code
+
+
+MAX_CODE_LENGTH = len(encode_short_code(MAX_RECIPE_ID))
+
+
+def decode_short_code(short_code):
+    if len(short_code) > MAX_CODE_LENGTH:
+        return None
+    recipe_id = 0
+    for char in short_code:
+        position = ALPHABET.find(char)
+        if position < 0:
+            return None
+        recipe_id = recipe_id * BASE + position
+    return recipe_id if recipe_id <= MAX_RECIPE_ID else None
+
+
+@lru_cache(maxsize=settings.SHORT_LINK_CACHE_SIZE)
+def resolve_short_code(short_code):
+    # Ненайденные коды не кэшируются: lru_cache не запоминает
+    # исключения, поэтому новые рецепты открываются сразу.
+    if len(short_code) > MAX_CODE_LENGTH:
+        raise Recipe.DoesNotExist
+    recipe_id = decode_short_code(short_code)
+    if recipe_id and Recipe.objects.filter(pk=recipe_id).exists():
+        return recipe_id
+    short_link = ShortLink.objects.filter(short_code=short_code).first()
+    if short_link is None:
+        raise Recipe.DoesNotExist
+    return short_link.recipe_id
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_deleted_recipe(sender, **kwargs):
+    resolve_short_code.cache_clear()
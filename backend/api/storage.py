@@ -0,0 +1,62 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME = re.compile(
+    r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$"
+)
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Файл называется по sha256 содержимого и раскладывается по
+    # подкаталогам из первых символов хэша: upload_to/ab/cd/abcd....ext.
+    # Одинаковые загрузки хранятся одним файлом, а содержимое по URL
+    # никогда не меняется, поэтому его можно кэшировать навсегда.
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def get_content_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f"{digest}{ext}"
+        ).replace("\\", "/")
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.location, prefix=".upload-"
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            name = self.get_content_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, full_path)
+            else:
+                # Свежая дата изменения не даёт сборщику мусора удалить
+                # файл, на который только что снова сослались.
+                os.utime(full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def delete(self, name):
+        # Один файл может принадлежать нескольким записям, поэтому
+        # неиспользуемые файлы удаляет только сборщик мусора.
+        pass
@@ -0,0 +1,106 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.http.multipartparser import MultiPartParserError
+from rest_framework import serializers
+from rest_framework.parsers import MultiPartParser
+
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+BASE64_CHUNK_SIZE = 64 * 1024
+BASE64_MARKER = ";base64,"
+
+
+def detect_image_format(head):
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    # Стоит перед TemporaryFileUploadHandler: отклоняет слишком большие
+    # запросы и файлы, которые не являются изображениями, до того
+    # как они целиком окажутся на диске.
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise MultiPartParserError("Размер файла превышает допустимый.")
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and detect_image_format(raw_data) is None:
+            raise MultiPartParserError("Файл не является изображением.")
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise MultiPartParserError("Размер файла превышает допустимый.")
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class ImageMultiPartParser(MultiPartParser):
+    # Обработчики ставятся только для представлений с изображениями:
+    # ошибки ImageUploadHandler превращаются здесь в ответ 400, а
+    # остальные формы (админка) загружают файлы как обычно. Загрузка
+    # всегда пишется во временный файл.
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        request.upload_handlers = [
+            ImageUploadHandler(request._request),
+            TemporaryFileUploadHandler(request._request),
+        ]
+        return super().parse(stream, media_type, parser_context)
+
+
+def decode_base64_image(data, name):
+    offset = data.find(BASE64_MARKER)
+    if not data.startswith("data:image") or offset < 0:
+        raise serializers.ValidationError("Некорректное изображение.")
+    offset += len(BASE64_MARKER)
+    if (len(data) - offset) // 4 * 3 > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError(
+            "Размер файла превышает допустимый."
+        )
+
+    content_type = data[len("data:"):offset - len(BASE64_MARKER)]
+    ext = content_type.split("/")[-1]
+    file = TemporaryUploadedFile(f"{name}.{ext}", content_type, 0, None)
+    try:
+        for start in range(offset, len(data), BASE64_CHUNK_SIZE):
+            chunk = base64.b64decode(
+                data[start:start + BASE64_CHUNK_SIZE], validate=True
+            )
+            if start == offset and detect_image_format(chunk) is None:
+                raise serializers.ValidationError(
+                    "Файл не является изображением."
+                )
+            file.write(chunk)
+    except binascii.Error:
+        file.close()
+        raise serializers.ValidationError("Некорректное изображение.")
+    except serializers.ValidationError:
+        file.close()
+        raise
+    file.size = file.tell()
+    file.seek(0)
+    return file
@@ -8,6 +8,8 @@ from .views import (
     IngredientViewSet,
     TagViewSet,
     ShoppingCartViewSet,
+    cache_stats,
+    metrics,
 )
 
 api_v1 = DefaultRouter()
@@ -26,6 +28,8 @@ urlpatterns = [
     path("", include(api_v1.urls)),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
+    path("cache-stats/", cache_stats, name="cache-stats"),
+    path("_metrics", metrics, name="metrics"),
     path(
         "docs/openapi-schema.yml",
         TemplateView.as_view(template_name=r"redoc.html"),
@@ -1,25 +1,36 @@
-import random
-import string
-import base64
-
-from django.shortcuts import get_object_or_404, redirect
-from django.core.files.base import ContentFile
-from django.db.models import Exists, OuterRef, Value, Sum, F
+from itertools import chain
+
+from django.shortcuts import redirect
+from django.db.models import (
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+)
 from django.db import models
-from django.http import HttpResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
 from django.conf import settings
-from django_filters.rest_framework import DjangoFilterBackend
 from djoser import views as djoser_views
 from rest_framework import status, viewsets, permissions, filters
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import (
+    IsAdminUser,
     IsAuthenticated,
     AllowAny,
     IsAuthenticatedOrReadOnly,
 )
-from rest_framework.filters import SearchFilter
-from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.decorators import action, api_view, permission_classes
 
 from food.models import (
     Ingredient,
@@ -28,40 +39,58 @@ from food.models import (
     Subscription,
     Favorite,
     ShoppingCart,
-    ShortLink,
     RecipeIngredient,
 )
 from users.models import User
 from .serializers import (
+    AvatarSerializer,
+    BulkIdsSerializer,
     IngredientSerializer,
     TagSerializer,
     RecipeSerializer,
     FavoriteSerializer,
     UserSerializer,
     SimpleRecipeSerializer,
+    get_recipes_limit,
+)
+from .bulk import (
+    add_links,
+    bulk_add,
+    bulk_remove,
+    clear_shopping_cart,
+    remove_links,
 )
+from .cache import (
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    AnonymousResponseCacheMixin,
+    get_cache_stats,
+    get_content_version,
+    get_version,
+)
+from .catalog import ingredient_catalog, tag_catalog
+from .conditional import ConditionalGetMixin
+from .ingredient_index import ingredient_index
+from .metrics import render_metrics
+from .filters import RecipeFilterBackend, RecipeSearchFilter
 from .pagination import RecipePagination, SubscriptionPagination
+from .shopping_list import (
+    SHOPPING_LIST_FORMATS,
+    IgnoreFormatContentNegotiation,
+    get_shopping_list,
+)
+from .short_links import encode_short_code, resolve_short_code
+from .uploads import ImageMultiPartParser
 
 
-def check_and_create_item(
-    model,
-    filter_kwargs,
-    create_kwargs,
-    serializer_class,
-    instance,
-    request,
-    response_detail,
-):
-    if model.objects.filter(**filter_kwargs).exists():
-        return Response(
-            {"detail": response_detail["add"]},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-    model.objects.create(**create_kwargs)
-    serializer = serializer_class(
-        instance, context={"request": request}
+def prefetch_recipe_relations(queryset):
+    return queryset.select_related("author").prefetch_related(
+        "tags",
+        Prefetch(
+            "recipe_ingredients",
+            queryset=RecipeIngredient.objects.select_related("ingredient"),
+        ),
     )
-    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 def add_item(
@@ -73,35 +102,25 @@ def add_item(
                 {"detail": "Нельзя подписаться на самого себя."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        data = {"user": request.user, "author": instance}
-        return check_and_create_item(
-            model, data, data, UserSerializer,
-            instance, request, response_detail
-        )
-    else:
-        data = {"author": author, "recipe": instance}
-        return check_and_create_item(
-            model, data, data, serializer_class,
-            instance, request, response_detail
+        serializer_class = UserSerializer
+    # Повторное добавление определяется по числу вставленных строк.
+    if not add_links(model, request.user, [instance.pk]):
+        return Response(
+            {"detail": response_detail["add"]},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    serializer = serializer_class(
+        instance, context={"request": request}
+    )
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 def remove_item(model, author, instance, request, response_detail):
-    if model == Subscription:
-        item = model.objects.filter(
-            user=request.user, author=instance
-        ).first()
-    else:
-        item = model.objects.filter(
-            author=author, recipe=instance
-        ).first()
-
-    if not item:
+    if not remove_links(model, request.user, [instance.pk]):
         return Response(
             {"detail": response_detail["remove"]},
             status=status.HTTP_400_BAD_REQUEST,
         )
-    item.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -114,27 +133,24 @@ def handle_subscription_action(
     response_detail,
     serializer_class=None,
 ):
-    try:
-        if action_name == "add":
-            return add_item(
-                model,
-                author,
-                instance,
-                request,
-                response_detail,
-                serializer_class,
-            )
+    if action_name == "add":
+        return add_item(
+            model,
+            author,
+            instance,
+            request,
+            response_detail,
+            serializer_class,
+        )
+    return remove_item(model, author, instance, request, response_detail)
 
-        elif action_name == "remove":
-            return remove_item(
-                model, author, instance, request, response_detail
-            )
 
-    except Exception as e:
-        return Response(
-            {"detail": str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+def handle_bulk_action(model, request):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data["ids"]
+    handler = bulk_add if request.method == "POST" else bulk_remove
+    return Response({"results": handler(model, request.user, ids)})
 
 
 class UserViewSet(djoser_views.UserViewSet):
@@ -174,24 +190,22 @@ class UserViewSet(djoser_views.UserViewSet):
         methods=["put", "delete"],
         url_path="me/avatar",
         permission_classes=[IsAuthenticated],
+        parser_classes=(JSONParser, FormParser, ImageMultiPartParser),
     )
     def update_avatar(self, request):
         user = request.user
 
         if request.method == "PUT":
-            if "avatar" in request.data:
-                format, imgstr = request.data["avatar"].split(
-                    ";base64,"
-                )
-                ext = format.split("/")[-1]
-
-                avatar_file = ContentFile(
-                    base64.b64decode(imgstr),
-                    name=f"avatar_{user.id}.{ext}",
+            if request.data.get("avatar"):
+                serializer = AvatarSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                avatar_file = serializer.validated_data["avatar"]
+                ext = avatar_file.name.rsplit(".", 1)[-1]
+
+                user.avatar.save(
+                    f"avatar_{user.id}.{ext}", avatar_file, save=False
                 )
-
-                user.avatar.save(avatar_file.name, avatar_file)
-                user.save()
+                user.save(update_fields=["avatar"])
 
                 avatar_url = request.build_absolute_uri(user.avatar.url)
 
@@ -200,7 +214,8 @@ class UserViewSet(djoser_views.UserViewSet):
                 )
 
         elif request.method == "DELETE":
-            user.avatar.delete(save=True)
+            user.avatar.delete(save=False)
+            user.save(update_fields=["avatar"])
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -217,6 +232,9 @@ class UserViewSet(djoser_views.UserViewSet):
     def subscribe(self, request, id=None):
         user = request.user
         author = self.get_object()
+        # Ответ строится после записи подписки, поэтому параметр
+        # проверяется заранее.
+        get_recipes_limit(request)
 
         action_name = "add" if request.method == "POST" else "remove"
         response_detail = {
@@ -233,34 +251,64 @@ class UserViewSet(djoser_views.UserViewSet):
             response_detail,
         )
 
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="subscribe",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_subscribe(self, request):
+        return handle_bulk_action(Subscription, request)
+
     @action(
         detail=False,
         methods=["get"],
         pagination_class=SubscriptionPagination,
     )
     def subscriptions(self, request):
-        subscriptions = Subscription.objects.filter(
-            user=request.user
-        ).order_by("id")
-        page = self.paginate_queryset(subscriptions)
+        recipes = Recipe.objects.order_by("id")
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author"))
+                    .order_by("id")
+                    .values("id")[:recipes_limit]
+                )
+            )
+
+        authors = (
+            User.objects.filter(subscribers__user=request.user)
+            .annotate(
+                is_user_subscribed=Value(
+                    True, output_field=models.BooleanField()
+                ),
+                subscription_id=F("subscribers__id"),
+            )
+            .prefetch_related(
+                Prefetch("recipes", queryset=recipes, to_attr="feed_recipes")
+            )
+            .order_by("subscription_id")
+        )
+        page = self.paginate_queryset(authors)
 
         if page is not None:
             serializer = UserSerializer(
-                [subscription.author for subscription in page],
-                many=True,
-                context={"request": request},
+                page, many=True, context={"request": request}
             )
             return self.get_paginated_response(serializer.data)
 
         serializer = UserSerializer(
-            [subscription.author for subscription in subscriptions],
-            many=True,
-            context={"request": request},
+            authors, many=True, context={"request": request}
         )
         return Response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ConditionalGetMixin,
+    AnonymousResponseCacheMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
@@ -270,15 +318,24 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ["name"]
 
-    def get_queryset(self):
-        queryset = Ingredient.objects.all()
-        name = self.request.query_params.get("name", None)
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name", None)
         if name:
-            queryset = queryset.filter(name__icontains=name)
-        return queryset
+            return self.conditional_response(self.search, request, name)
+        if request.accepted_renderer.format == "json":
+            return ingredient_catalog.response(request)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, name):
+        return Response(ingredient_index.search(name))
 
+    def get_validators(self, request):
+        return (get_version(INGREDIENTS_VERSION_KEY),), None
 
-class TagViewSet(viewsets.ModelViewSet):
+
+class TagViewSet(
+    ConditionalGetMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     queryset = Tag.objects.all().order_by("id")
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
@@ -287,23 +344,50 @@ class TagViewSet(viewsets.ModelViewSet):
         "get",
     ]
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == "json":
+            return tag_catalog.response(request)
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    def get_validators(self, request):
+        return (get_version(TAGS_VERSION_KEY),), None
+
+
+class RecipeViewSet(
+    ConditionalGetMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     queryset = Recipe.objects.all().order_by("name")
     serializer_class = RecipeSerializer
     pagination_class = RecipePagination
     permission_classes = [IsAuthenticatedOrReadOnly]
     http_method_names = ["get", "post", "patch", "delete"]
-    filter_backends = (DjangoFilterBackend, SearchFilter)
-    filterset_fields = ["author"]
+    parser_classes = (JSONParser, FormParser, ImageMultiPartParser)
+    filter_backends = (
+        RecipeFilterBackend,
+        RecipeSearchFilter,
+        OrderingFilter,
+    )
+    ordering_fields = ["name", "favorites_count", "shopping_carts_count"]
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_validators(self, request):
+        # Версия содержимого меняется при любой записи, которая видна
+        # в ответах рецептов, а фильтры и страница входят в ETag через
+        # адрес запроса. Счётчики меняются без смены версии, поэтому
+        # при сортировке по ним проверка свежести не делается.
+        if "_count" in request.query_params.get("ordering", ""):
+            return None
+        return (get_content_version(),), None
+
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
 
+        if self.action in ["list", "retrieve"]:
+            queryset = prefetch_recipe_relations(queryset)
+
         if user.is_authenticated:
             queryset = queryset.annotate(
                 is_recipe_favorited=Exists(
@@ -327,33 +411,6 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 ),
             )
 
-        is_favorited = self.request.query_params.get(
-            "is_favorited", None
-        )
-        if is_favorited is not None:
-            if user.is_authenticated:
-                if is_favorited.lower() == "true":
-                    queryset = queryset.filter(favorites__author=user)
-                elif is_favorited.lower() == "false":
-                    queryset = queryset.exclude(favorites__author=user)
-        if self.request.query_params.get("is_favorited") in [
-            "1",
-            "true",
-        ]:
-            queryset = queryset.filter(is_recipe_favorited=True)
-
-        if self.request.query_params.get("is_in_shopping_cart") in [
-            "1",
-            "true",
-        ]:
-            queryset = queryset.filter(is_in_user_shopping_cart=True)
-
-        tag_slugs = self.request.query_params.getlist("tags")
-        if tag_slugs:
-            queryset = queryset.filter(
-                tags__slug__in=tag_slugs
-            ).distinct()
-
         return queryset
 
     def destroy(self, request, pk=None):
@@ -406,44 +463,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
             RecipeSerializer,
         )
 
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="favorite",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_favorite(self, request):
+        return handle_bulk_action(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="shopping_cart",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_shopping_cart(self, request):
+        return handle_bulk_action(ShoppingCart, request)
+
     @action(
         detail=False,
         methods=["get"],
         url_path="download_shopping_cart",
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatContentNegotiation,
     )
     def download_shopping_cart(self, request):
-        shopping_cart_recipes = Recipe.objects.filter(
-            in_shopping_cart__author=request.user
-        )
+        file_format = request.query_params.get("format", "txt")
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {"detail": f"Неизвестный формат файла: {file_format}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        content_type, render = SHOPPING_LIST_FORMATS[file_format]
 
-        if not shopping_cart_recipes.exists():
+        items = get_shopping_list(request.user)
+        first_item = next(items, None)
+        if first_item is None:
             return Response(
                 {"detail": "Shopping cart is empty."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        ingredients_summary = (
-            RecipeIngredient.objects.filter(
-                recipe__in=shopping_cart_recipes
-            )
-            .values(
-                ingredient_name=F("ingredient__name"),
-                ingredient_unit=F("ingredient__measurement_unit"),
-            )
-            .annotate(total_amount=Sum("amount"))
+        content = render(chain([first_item], items))
+        # txt и CSV пишутся по мере чтения строк, а PDF приходит
+        # готовым файлом.
+        response_class = (
+            FileResponse if hasattr(content, "read") else StreamingHttpResponse
         )
-
-        content = "Ваш список покупок:\n"
-        for item in ingredients_summary:
-            line = (
-                f"{item['ingredient_name']}: "
-                f"{item['total_amount']} {item['ingredient_unit']}\n"
-            )
-            content += line
-
-        response = HttpResponse(content, content_type="text/plain")
+        response = response_class(content, content_type=content_type)
         response["Content-Disposition"] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{file_format}"'
         )
         return response
 
@@ -472,25 +542,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
             SimpleRecipeSerializer,
         )
 
-    def generate_short_code(self):
-        return "".join(
-            random.choices(string.ascii_letters + string.digits, k=6)
-        )
-
     @action(detail=True, methods=["get"], url_path="get-link")
     def get_recipe_link(self, request, pk=None):
         recipe = self.get_object()
-
-        short_link, created = ShortLink.objects.get_or_create(
-            recipe=recipe
-        )
-
-        if created:
-            short_link.short_code = self.generate_short_code()
-            short_link.save()
-
         short_url = (
-            f"https://{settings.SITE_DOMAIN}/s/{short_link.short_code}"
+            f"https://{settings.SITE_DOMAIN}/s/"
+            f"{encode_short_code(recipe.id)}"
         )
 
         return Response(
@@ -499,13 +556,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 
 def redirect_to_recipe(request, short_code):
-    short_link = get_object_or_404(ShortLink, short_code=short_code)
-    recipe_url = (
-        f"http://{settings.SITE_DOMAIN}/recipes/{short_link.recipe.id}"
-    )
+    try:
+        recipe_id = resolve_short_code(short_code)
+    except Recipe.DoesNotExist:
+        raise Http404
+    recipe_url = f"http://{settings.SITE_DOMAIN}/recipes/{recipe_id}"
     return redirect(recipe_url)
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(get_cache_stats())
+
+
+def metrics(request):
+    # Без METRICS_TOKEN эндпоинт выключен.
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4"
+    )
+
+
 class FavoriteViewSet(viewsets.ModelViewSet):
     queryset = Favorite.objects.all()
     serializer_class = FavoriteSerializer
@@ -525,11 +601,16 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
     http_method_names = ["get", "post", "delete"]
 
     def get_queryset(self):
-        return Recipe.objects.filter(
-            in_shopping_cart__author=self.request.user
+        return prefetch_recipe_relations(
+            Recipe.objects.filter(in_shopping_cart__author=self.request.user)
         )
 
     def list(self, request, *args, **kwargs):
         recipes = self.get_queryset()
         serializer = RecipeSerializer(recipes, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=["delete"])
+    def clear(self, request):
+        clear_shopping_cart(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -86,6 +87,36 @@ DATABASES = {
 }
 
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Общий для всех воркеров gunicorn кэш ответов API.
+    "api": {
+        "BACKEND": os.getenv(
+            "API_CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv(
+            "API_CACHE_LOCATION", os.path.join(BASE_DIR, "cache/")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+API_CACHE_ALIAS = "api"
+API_CACHE_TIMEOUT = 300
+# Проверенные токены запоминаются в LRU каждого процесса вместе со
+# снимком пользователя. Изменения пользователя через update() без
+# смены версии видны не позже, чем через AUTH_TOKEN_CACHE_TTL секунд.
+AUTH_TOKEN_CACHE_SIZE = 1000
+AUTH_TOKEN_CACHE_TTL = 60
+
+# Гистограммы запросов общие для всех воркеров gunicorn: каждый процесс
+# пишет свой файл в METRICS_DIR, а /api/_metrics их суммирует.
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(BASE_DIR, "metrics/"))
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 AUTH_USER_MODEL = "users.User"
 
 DJOSER = {
@@ -100,7 +131,7 @@ CORS_ORIGIN_ALLOW_ALL = True
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -109,6 +140,16 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 6,
 }
 SITE_DOMAIN = "damirsite.site"
+SHORT_LINK_CACHE_SIZE = 10000
+
+# Наибольшее число id в пакетных запросах избранного, корзины и подписок.
+BULK_ACTION_LIMIT = 100
+
+INGREDIENT_INDEX_TTL = 300
+# Как часто индекс ингредиентов сверяет версию справочника, секунды.
+INGREDIENT_INDEX_VERSION_INTERVAL = 5
+INGREDIENT_SEARCH_LIMIT = 50
+SHOPPING_LIST_PDF_FONT = os.getenv("SHOPPING_LIST_PDF_FONT", "DejaVuSans.ttf")
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -151,6 +192,16 @@ STATIC_ROOT = BASE_DIR / "collected_static"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
+DEFAULT_FILE_STORAGE = "api.storage.ContentAddressedStorage"
+
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_RENDITIONS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+IMAGE_RENDITION_WORKERS = int(os.getenv("IMAGE_RENDITION_WORKERS", 2))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
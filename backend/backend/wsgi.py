@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Индекс ингредиентов собирается до первого запроса воркера.
+from api.ingredient_index import ingredient_index  # noqa: E402
+
+ingredient_index.warm()
@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from users.models import User
 from food.models import (
@@ -10,10 +9,11 @@ from food.models import (
     Recipe,
     Ingredient,
     Tag,
+    ShortLink,
 )
 
 admin.site.register(
-    (ShoppingCart, Favorite, Subscription, RecipeIngredient),
+    (ShoppingCart, Favorite, Subscription, RecipeIngredient, ShortLink),
     admin.ModelAdmin,
 )
 
@@ -29,21 +29,12 @@ class RecipeIngredientInline(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("name", "author", "favorite_count")
+    list_display = ("name", "author", "favorites_count")
     search_fields = ["name", "author__username"]
     list_filter = ("tags",)
+    readonly_fields = ("favorites_count", "shopping_carts_count")
     inlines = [RecipeIngredientInline]
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        qs = qs.annotate(favorite_count=Count("favorited_recipes"))
-        return qs
-
-    def favorite_count(self, obj):
-        return obj.favorite_count
-
-    favorite_count.short_description = "Количество в избранном"
-
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ("name", "measurement_unit")
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "food"
+
+    def ready(self):
+        from . import (  # noqa: F401
+            counters,
+            search,
+            shopping_list,
+            timestamps,
+        )
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from .models import Favorite, Recipe, ShoppingCart, Subscription
+
+# Счётчик, модель со счётчиком и модель-источник с полем-ссылкой.
+COUNTERS = [
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "shopping_carts_count", ShoppingCart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "subscribers_count", Subscription, "author"),
+]
+
+
+def change_counter(model, counter, pks, delta):
+    if not pks or not delta:
+        return
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{counter}__gte": -delta})
+    queryset.update(**{counter: F(counter) + delta})
+
+
+def actual_count(source, field):
+    return Coalesce(
+        Subquery(
+            source.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def reconcile_counter(model, counter, source, field, pks):
+    actual = actual_count(source, field)
+    drifted = list(
+        model.objects.filter(pk__in=pks)
+        .annotate(actual=actual)
+        .exclude(**{counter: F("actual")})
+        .values_list("pk", flat=True)
+    )
+    if drifted:
+        model.objects.filter(pk__in=drifted).update(**{counter: actual})
+    return len(drifted)
+
+
+def update_counters(source, instances, delta):
+    for model, counter, counted, field in COUNTERS:
+        if counted is source:
+            pks = [getattr(instance, f"{field}_id") for instance in instances]
+            change_counter(model, counter, pks, delta)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_counters(sender, [instance], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(sender, [instance], -1)
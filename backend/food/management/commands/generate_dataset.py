@@ -0,0 +1,298 @@
+import io
+import random
+import time
+from bisect import bisect
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from food.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+)
+from food.signals import bulk_loaded
+from users.models import User
+
+TAGS = [
+    ("Завтрак", "breakfast"),
+    ("Обед", "lunch"),
+    ("Ужин", "dinner"),
+    ("Десерт", "dessert"),
+    ("Выпечка", "bakery"),
+    ("Напитки", "drinks"),
+]
+RECIPE_NAMES = [
+    "{} по-домашнему",
+    "{} на скорую руку",
+    "{} по бабушкиному рецепту",
+    "Праздничный рецепт: {}",
+    "{} с пряностями",
+]
+
+
+class PowerLaw:
+    # Элемент с рангом k выбирается с вероятностью ~ 1 / k ** alpha:
+    # немного очень популярных авторов и рецептов и длинный хвост.
+    # Ранги перемешаны, чтобы популярность не совпадала с порядком id.
+
+    def __init__(self, items, alpha, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank ** alpha for rank in range(1, len(self.items) + 1)
+            )
+        )
+        self.rng = rng
+
+    def sample(self):
+        position = self.rng.random() * self.cum_weights[-1]
+        index = bisect(self.cum_weights, position)
+        return self.items[min(index, len(self.items) - 1)]
+
+
+def created_ids(model, objects):
+    # SQLite в Django 3.2 не возвращает id из bulk_create, а пачка
+    # создаётся в транзакции, поэтому её id — последние в таблице.
+    if objects[0].pk is not None:
+        return [obj.pk for obj in objects]
+    return sorted(
+        model.objects.order_by("-pk").values_list("pk", flat=True)[
+            :len(objects)
+        ]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими пользователями, рецептами, "
+        "избранным, корзинами и подписками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--favorites", type=int, default=50000)
+        parser.add_argument("--carts", type=int, default=20000)
+        parser.add_argument("--subscriptions", type=int, default=10000)
+        parser.add_argument("--max-ingredients", type=int, default=12)
+        parser.add_argument("--max-tags", type=int, default=3)
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.1,
+            help="Показатель степенного распределения популярности.",
+        )
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        if User.objects.filter(
+            username__startswith=f"{options['prefix']}_"
+        ).exists():
+            raise CommandError(
+                f"Данные с префиксом {options['prefix']} уже созданы."
+            )
+        if not Ingredient.objects.exists():
+            call_command("load_ingredients", stdout=self.stdout)
+
+        started = time.perf_counter()
+        tags = self.ensure_tags()
+        ingredients = list(Ingredient.objects.values_list("id", "name"))
+        user_ids = self.step("Пользователи", self.create_users)
+        authors = PowerLaw(user_ids, options["alpha"], self.rng)
+        recipe_ids = self.step(
+            "Рецепты",
+            self.create_recipes,
+            authors,
+            PowerLaw(ingredients, options["alpha"], self.rng),
+            tags,
+        )
+        users = PowerLaw(user_ids, 0.5, self.rng)
+        recipes = PowerLaw(recipe_ids, options["alpha"], self.rng)
+        self.step(
+            "Избранное",
+            self.create_pairs,
+            Favorite,
+            "author_id",
+            "recipe_id",
+            options["favorites"],
+            users,
+            recipes,
+        )
+        self.step(
+            "Корзины",
+            self.create_pairs,
+            ShoppingCart,
+            "author_id",
+            "recipe_id",
+            options["carts"],
+            users,
+            recipes,
+        )
+        self.step(
+            "Подписки",
+            self.create_pairs,
+            Subscription,
+            "user_id",
+            "author_id",
+            options["subscriptions"],
+            users,
+            authors,
+        )
+        # bulk_create не вызывает сигналы, поэтому счётчики, списки
+        # покупок и поисковый индекс пересчитываются целиком.
+        call_command("reconcile_counters", stdout=self.stdout)
+        call_command("rebuild_shopping_lists", stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        bulk_loaded.send(sender=Recipe)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово за {time.perf_counter() - started:.1f} с."
+            )
+        )
+
+    def step(self, title, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        count = result if isinstance(result, int) else len(result)
+        self.stdout.write(
+            f"{title}: {count} за "
+            f"{time.perf_counter() - started:.1f} с."
+        )
+        return result
+
+    def ensure_tags(self):
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slug) for name, slug in TAGS],
+            ignore_conflicts=True,
+        )
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_users(self):
+        prefix = self.options["prefix"]
+        password = make_password("password")
+        user_ids = []
+        for start in range(0, self.options["users"], self.batch_size):
+            stop = min(start + self.batch_size, self.options["users"])
+            users = [
+                User(
+                    email=f"{prefix}_{number}@example.com",
+                    username=f"{prefix}_{number}",
+                    first_name=f"Имя {number}",
+                    last_name=f"Фамилия {number}",
+                    password=password,
+                )
+                for number in range(start, stop)
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                user_ids += created_ids(User, users)
+        return user_ids
+
+    def create_image(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), (230, 160, 90)).save(buffer, "JPEG")
+        return default_storage.save(
+            "recipes/images/dataset.jpg", ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, authors, ingredients, tags):
+        image = self.create_image()
+        Through = Recipe.tags.through
+        recipe_ids = []
+        total = self.options["recipes"]
+        for start in range(0, total, self.batch_size):
+            recipes = []
+            contents = []
+            for number in range(start, min(start + self.batch_size, total)):
+                recipe_ingredients = {
+                    ingredients.sample()
+                    for _ in range(
+                        self.rng.randint(2, self.options["max_ingredients"])
+                    )
+                }
+                main = next(iter(recipe_ingredients))[1]
+                recipes.append(
+                    Recipe(
+                        author_id=authors.sample(),
+                        name=self.rng.choice(RECIPE_NAMES).format(
+                            main.capitalize()
+                        ) + f" №{number}",
+                        text="Описание приготовления. " * 20,
+                        cooking_time=self.rng.randint(5, 180),
+                        image=image,
+                    )
+                )
+                contents.append(
+                    (
+                        recipe_ingredients,
+                        self.rng.sample(
+                            tags,
+                            self.rng.randint(
+                                1, min(self.options["max_tags"], len(tags))
+                            ),
+                        ),
+                    )
+                )
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                ids = created_ids(Recipe, recipes)
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe_id=recipe_id,
+                        ingredient_id=ingredient_id,
+                        amount=self.rng.randint(1, 500),
+                    )
+                    for recipe_id, (recipe_ingredients, _) in zip(
+                        ids, contents
+                    )
+                    for ingredient_id, _ in recipe_ingredients
+                )
+                Through.objects.bulk_create(
+                    Through(recipe_id=recipe_id, tag_id=tag_id)
+                    for recipe_id, (_, recipe_tags) in zip(ids, contents)
+                    for tag_id in recipe_tags
+                )
+            recipe_ids += ids
+        return recipe_ids
+
+    def create_pairs(self, model, first, second, total, firsts, seconds):
+        # Повторы и уже существующие пары отбрасываются, поэтому
+        # считаются реально вставленные строки. Число попыток
+        # ограничено на случай, если свободных пар почти не осталось.
+        before = model.objects.count()
+        created = 0
+        for _ in range(max(1, total // self.batch_size) * 3):
+            if created >= total:
+                break
+            size = min(self.batch_size, total - created)
+            pairs = {
+                (firsts.sample(), seconds.sample()) for _ in range(size)
+            }
+            if model is Subscription:
+                pairs = {pair for pair in pairs if pair[0] != pair[1]}
+            model.objects.bulk_create(
+                [
+                    model(**{first: left, second: right})
+                    for left, right in pairs
+                ],
+                ignore_conflicts=True,
+            )
+            created = model.objects.count() - before
+        return created
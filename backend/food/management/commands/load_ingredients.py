@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from food.models import Ingredient
+from food.signals import bulk_loaded
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / "data" / "ingredients.csv"
+JSON_CHUNK_SIZE = 64 * 1024
+NAME_LENGTH = Ingredient._meta.get_field("name").max_length
+UNIT_LENGTH = Ingredient._meta.get_field("measurement_unit").max_length
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    # Массив читается кусками и разбирается по одному объекту, поэтому
+    # память не зависит от размера файла.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    expected = "["
+    while expected:
+        chunk = file.read(JSON_CHUNK_SIZE)
+        buffer = (buffer + chunk).lstrip()
+        while buffer and expected:
+            if expected == "value" and buffer[0] != "]":
+                try:
+                    item, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if chunk:
+                        break
+                    raise CommandError("Некорректный JSON.")
+                if not isinstance(item, dict) or not {
+                    "name", "measurement_unit"
+                } <= item.keys():
+                    raise CommandError(
+                        "Ожидаются объекты с полями name и measurement_unit."
+                    )
+                yield item["name"], item["measurement_unit"]
+                buffer = buffer[end:].lstrip()
+                expected = ","
+                continue
+            if buffer[0] == "]" and expected != "[":
+                expected = None
+            elif buffer[0] == expected:
+                expected = "value"
+            else:
+                raise CommandError("JSON-файл должен содержать массив.")
+            buffer = buffer[1:].lstrip()
+        if not chunk and expected:
+            raise CommandError("Некорректный JSON.")
+
+
+def unique_rows(rows):
+    seen = set()
+    for number, (name, measurement_unit) in enumerate(rows, 1):
+        key = (str(name).strip(), str(measurement_unit).strip())
+        if len(key[0]) > NAME_LENGTH or len(key[1]) > UNIT_LENGTH:
+            raise CommandError(
+                f"Запись {number}: название длиннее {NAME_LENGTH} или "
+                f"единица измерения длиннее {UNIT_LENGTH} символов."
+            )
+        if key[0] and key not in seen:
+            seen.add(key)
+            yield key
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Загружает ингредиенты из CSV или JSON файла."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default=str(DEFAULT_PATH))
+        parser.add_argument(
+            "--format", choices=["csv", "json"], default=None
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден.")
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        readers = {"csv": read_csv, "json": read_json}
+        if file_format not in readers:
+            raise CommandError(f"Неизвестный формат файла: {file_format}.")
+
+        use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        started = time.perf_counter()
+        before = Ingredient.objects.count()
+        with path.open(encoding="utf-8", newline="") as file, (
+            transaction.atomic()
+        ):
+            rows = unique_rows(readers[file_format](file))
+            if use_copy:
+                total = self.copy_rows(rows, options["batch_size"])
+            else:
+                total = self.bulk_create_rows(rows, options["batch_size"])
+        bulk_loaded.send(sender=Ingredient)
+        created = Ingredient.objects.count() - before
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано строк: {total}, добавлено: {created}, "
+                f"{total / elapsed if elapsed else total:.0f} строк/с."
+            )
+        )
+
+    def bulk_create_rows(self, rows, batch_size):
+        total = 0
+        for batch in batched(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+            total += len(batch)
+        return total
+
+    def copy_rows(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE ingredients_import "
+                f"(name varchar({NAME_LENGTH}), "
+                f"measurement_unit varchar({UNIT_LENGTH})) "
+                "ON COMMIT DROP"
+            )
+            for batch in batched(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY ingredients_import (name, measurement_unit) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+                total += len(batch)
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                "SELECT name, measurement_unit FROM ingredients_import "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING"
+            )
+        return total
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from food.models import Recipe
+from food.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс рецептов."
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(
+            f"Проиндексировано рецептов: {Recipe.objects.count()}."
+        )
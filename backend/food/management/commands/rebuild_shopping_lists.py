@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from food.models import ShoppingCart, ShoppingListItem
+from food.shopping_list import calculate_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает списки покупок по корзинам пользователей "
+        "и сверяет их с сохранёнными."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить расхождения, ничего не изменяя.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list("author_id", flat=True))
+            | set(ShoppingListItem.objects.values_list("user_id", flat=True))
+        )
+        batch_size = options["batch_size"]
+        mismatched = 0
+
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                expected = calculate_shopping_lists(batch)
+                stored = {
+                    (user_id, ingredient_id): amount
+                    for user_id, ingredient_id, amount in (
+                        ShoppingListItem.objects.select_for_update()
+                        .filter(user_id__in=batch)
+                        .values_list("user_id", "ingredient_id", "amount")
+                    )
+                }
+                if stored == expected:
+                    continue
+                wrong_users = {
+                    key[0]
+                    for key in expected.keys() | stored.keys()
+                    if expected.get(key) != stored.get(key)
+                }
+                mismatched += len(wrong_users)
+                if options["check"]:
+                    continue
+                ShoppingListItem.objects.filter(
+                    user_id__in=wrong_users
+                ).delete()
+                ShoppingListItem.objects.bulk_create(
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in expected.items()
+                    if user_id in wrong_users
+                )
+
+        if options["check"] and mismatched:
+            raise CommandError(
+                f"Списки покупок расходятся у {mismatched} пользователей."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено пользователей: {len(user_ids)}, "
+                f"исправлено: {0 if options['check'] else mismatched}."
+            )
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food.counters import COUNTERS, reconcile_counter
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики избранного, покупок, рецептов и подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for model, counter, source, field in COUNTERS:
+            pks = model.objects.order_by("pk").values_list("pk", flat=True)
+            repaired = 0
+            last_pk = 0
+            while True:
+                batch = list(pks.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    repaired += reconcile_counter(
+                        model, counter, source, field, batch
+                    )
+                last_pk = batch[-1]
+            self.stdout.write(
+                f"{model.__name__}.{counter}: исправлено {repaired}."
+            )
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны."))
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:31
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    # Перед добавлением ограничения дубликаты сливаются в ингредиент
+    # с наименьшим id. Если в рецепте были оба, количества
+    # складываются.
+    Ingredient = apps.get_model("food", "Ingredient")
+    RecipeIngredient = apps.get_model("food", "RecipeIngredient")
+    groups = (
+        Ingredient.objects.values("name", "measurement_unit")
+        .annotate(kept_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in groups:
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group["name"],
+                measurement_unit=group["measurement_unit"],
+            )
+            .exclude(id=group["kept_id"])
+            .values_list("id", flat=True)
+        )
+        rows = RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ).order_by("id")
+        for row in rows:
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=group["kept_id"]
+            ).first()
+            if kept is None:
+                row.ingredient_id = group["kept_id"]
+                row.save(update_fields=["ingredient"])
+            else:
+                kept.amount += row.amount
+                kept.save(update_fields=["amount"])
+                row.delete()
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    # На PostgreSQL ограничение нельзя добавить в той же транзакции,
+    # где изменялись строки таблицы: остаются отложенные триггеры
+    # внешних ключей. Слияние выполняется в своей транзакции, а
+    # ограничение добавляется после её фиксации.
+    atomic = False
+
+    dependencies = [
+        ("food", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop,
+            atomic=True,
+        ),
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("name", "measurement_unit"), name="unique_ingredient"
+            ),
+        ),
+    ]
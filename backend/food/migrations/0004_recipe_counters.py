@@ -0,0 +1,63 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("food", "Recipe")
+    Favorite = apps.get_model("food", "Favorite")
+    ShoppingCart = apps.get_model("food", "ShoppingCart")
+    Subscription = apps.get_model("food", "Subscription")
+    User = apps.get_model("users", "User")
+
+    counters = [
+        (Recipe, "favorites_count", Favorite, "recipe"),
+        (Recipe, "shopping_carts_count", ShoppingCart, "recipe"),
+        (User, "recipes_count", Recipe, "author"),
+        (User, "subscribers_count", Subscription, "author"),
+    ]
+    for model, counter, source, field in counters:
+        model.objects.update(
+            **{
+                counter: Coalesce(
+                    Subquery(
+                        source.objects.filter(**{field: OuterRef("pk")})
+                        .order_by()
+                        .values(field)
+                        .annotate(total=Count("pk"))
+                        .values("total")
+                    ),
+                    Value(0),
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_counters"),
+        ("food", "0003_shoppinglistitem"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                verbose_name="Количество в избранном",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="shopping_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество в списках покупок"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0005_recipe_image_renditions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["name", "id"], name="recipe_name_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0006_recipe_name_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "name", "id"],
+                name="recipe_author_name_id_idx",
+            ),
+        ),
+        # Автоматическая таблица связи рецептов с тегами проиндексирована
+        # только по (recipe_id, tag_id), а фильтр идёт от тега к рецептам.
+        migrations.RunSQL(
+            "CREATE INDEX recipe_tags_tag_recipe_idx "
+            "ON food_recipe_tags (tag_id, recipe_id);",
+            "DROP INDEX recipe_tags_tag_recipe_idx;",
+        ),
+    ]
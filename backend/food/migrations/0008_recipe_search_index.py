@@ -0,0 +1,60 @@
+# Generated by Django 3.2.3 on 2026-10-18 09:10
+
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "SELECT {aggregate}(food_ingredient.name, ' ') "
+    "FROM food_recipeingredient JOIN food_ingredient "
+    "ON food_ingredient.id = food_recipeingredient.ingredient_id "
+    "WHERE food_recipeingredient.recipe_id = food_recipe.id"
+)
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE food_recipe ADD COLUMN search_vector tsvector;",
+    "CREATE INDEX recipe_search_vector_idx "
+    "ON food_recipe USING gin (search_vector);",
+    "UPDATE food_recipe SET search_vector = "
+    "setweight(to_tsvector('russian', food_recipe.name), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(("
+    + INGREDIENT_NAMES.format(aggregate="string_agg")
+    + "), '')), 'B') || "
+    "setweight(to_tsvector('russian', food_recipe.text), 'C');",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX recipe_search_vector_idx;",
+    "ALTER TABLE food_recipe DROP COLUMN search_vector;",
+]
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE food_recipe_search USING fts5("
+    "name, ingredients, text, "
+    "tokenize = 'unicode61 remove_diacritics 2');",
+    "INSERT INTO food_recipe_search (rowid, name, ingredients, text) "
+    "SELECT food_recipe.id, food_recipe.name, coalesce(("
+    + INGREDIENT_NAMES.format(aggregate="group_concat")
+    + "), ''), food_recipe.text FROM food_recipe;",
+]
+SQLITE_BACKWARD = ["DROP TABLE food_recipe_search;"]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statements = postgres if vendor == "postgresql" else sqlite
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0007_recipe_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
@@ -11,6 +11,12 @@ class Ingredient(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "measurement_unit"],
+                name="unique_ingredient",
+            )
+        ]
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
@@ -54,6 +60,9 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="Фотография", upload_to="recipes/images/"
     )
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through="RecipeIngredient",
@@ -70,8 +79,24 @@ class Recipe(models.Model):
     favorited_by = models.ManyToManyField(
         User, related_name="favorited_recipes_list", blank=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Количество в избранном"
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество в списках покупок"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Дата изменения"
+    )
 
     class Meta:
+        indexes = [
+            models.Index(fields=["name", "id"], name="recipe_name_id_idx"),
+            models.Index(
+                fields=["author", "name", "id"],
+                name="recipe_author_name_id_idx",
+            ),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -157,6 +182,29 @@ class ShoppingCart(models.Model):
         verbose_name_plural = "Списки покупок"
 
 
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    amount = models.IntegerField(verbose_name="Количество")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_list_item",
+            )
+        ]
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Строки списков покупок"
+
+    def __str__(self):
+        return f"{self.ingredient.name} - {self.amount}"
+
+
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
         Recipe,
@@ -0,0 +1,181 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# PostgreSQL хранит tsvector в колонке food_recipe.search_vector с
+# GIN-индексом, остальные базы - копию текста в таблице FTS5 SQLite.
+SEARCH_TABLE = "food_recipe_search"
+BATCH_SIZE = 500
+WORD = re.compile(r"\w+")
+
+RECIPE_TABLE = Recipe._meta.db_table
+RECIPE_INGREDIENT_TABLE = RecipeIngredient._meta.db_table
+INGREDIENT_TABLE = Ingredient._meta.db_table
+
+INGREDIENT_NAMES = (
+    "SELECT {aggregate} FROM {recipe_ingredient} "
+    "JOIN {ingredient} ON {ingredient}.id = "
+    "{recipe_ingredient}.ingredient_id "
+    "WHERE {recipe_ingredient}.recipe_id = {recipe}.id"
+)
+POSTGRES_INGREDIENT_NAMES = INGREDIENT_NAMES.format(
+    aggregate=f"string_agg({INGREDIENT_TABLE}.name, ' ')",
+    recipe_ingredient=RECIPE_INGREDIENT_TABLE,
+    ingredient=INGREDIENT_TABLE,
+    recipe=RECIPE_TABLE,
+)
+SQLITE_INGREDIENT_NAMES = INGREDIENT_NAMES.format(
+    aggregate=f"group_concat({INGREDIENT_TABLE}.name, ' ')",
+    recipe_ingredient=RECIPE_INGREDIENT_TABLE,
+    ingredient=INGREDIENT_TABLE,
+    recipe=RECIPE_TABLE,
+)
+
+# Название важнее ингредиентов, ингредиенты - описания.
+POSTGRES_UPDATE = (
+    f"UPDATE {RECIPE_TABLE} SET search_vector = "
+    f"setweight(to_tsvector('russian', {RECIPE_TABLE}.name), 'A') || "
+    "setweight(to_tsvector('russian', "
+    f"coalesce(({POSTGRES_INGREDIENT_NAMES}), '')), 'B') || "
+    f"setweight(to_tsvector('russian', {RECIPE_TABLE}.text), 'C')"
+)
+POSTGRES_QUERY = "websearch_to_tsquery('russian', %s)"
+SQLITE_INSERT = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, name, ingredients, text) "
+    f"SELECT {RECIPE_TABLE}.id, {RECIPE_TABLE}.name, "
+    f"coalesce(({SQLITE_INGREDIENT_NAMES}), ''), {RECIPE_TABLE}.text "
+    f"FROM {RECIPE_TABLE}"
+)
+SQLITE_RANK = f"bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0)"
+
+
+def is_postgresql():
+    return connection.vendor == "postgresql"
+
+
+def batches(recipe_ids):
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        yield recipe_ids[start:start + BATCH_SIZE]
+
+
+def update_search_index(recipe_ids):
+    with connection.cursor() as cursor:
+        for batch in batches(recipe_ids):
+            if is_postgresql():
+                cursor.execute(
+                    f"{POSTGRES_UPDATE} WHERE {RECIPE_TABLE}.id = ANY(%s)",
+                    [batch],
+                )
+                continue
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+                batch,
+            )
+            cursor.execute(
+                f"{SQLITE_INSERT} WHERE {RECIPE_TABLE}.id IN ({placeholders})",
+                batch,
+            )
+
+
+def remove_from_search_index(recipe_ids):
+    # В PostgreSQL tsvector удаляется вместе со строкой рецепта.
+    if is_postgresql():
+        return
+    with connection.cursor() as cursor:
+        for batch in batches(recipe_ids):
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+                batch,
+            )
+
+
+def rebuild_search_index():
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_postgresql():
+            cursor.execute(POSTGRES_UPDATE)
+            return
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(SQLITE_INSERT)
+
+
+def get_sqlite_query(text):
+    # В FTS5 нет русского стемминга, поэтому каждое слово ищется
+    # как префикс: «томат» найдёт «томаты» и «томатный».
+    words = WORD.findall(text.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, text):
+    # Возвращает только найденные рецепты с аннотацией search_rank:
+    # чем больше, тем релевантнее.
+    if not WORD.search(text):
+        return queryset
+    if is_postgresql():
+        return queryset.filter(
+            RawSQL(
+                f"{RECIPE_TABLE}.search_vector @@ {POSTGRES_QUERY}",
+                [text],
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank_cd({RECIPE_TABLE}.search_vector, "
+                f"{POSTGRES_QUERY})",
+                [text],
+                output_field=FloatField(),
+            )
+        )
+    query = get_sqlite_query(text)
+    return queryset.filter(
+        id__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s",
+            [query],
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f"(SELECT -{SQLITE_RANK} FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s "
+            f"AND {SEARCH_TABLE}.rowid = {RECIPE_TABLE}.id)",
+            [query],
+            output_field=FloatField(),
+        )
+    )
+
+
+def schedule_update(recipe_ids):
+    # Ингредиенты рецепта сохраняются после самого рецепта в той же
+    # транзакции, поэтому индекс обновляется после её завершения.
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_update([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def index_renamed_ingredient(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        schedule_update(
+            RecipeIngredient.objects.filter(ingredient=instance).values_list(
+                "recipe_id", flat=True
+            )
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    remove_from_search_index([instance.pk])
@@ -0,0 +1,174 @@
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def change_shopping_lists(cart_items, sign):
+    # cart_items - пары (user_id, recipe_id), sign - 1 или -1.
+    cart_items = list(cart_items)
+    if not cart_items:
+        return
+
+    recipe_ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id__in={recipe_id for _, recipe_id in cart_items}
+    ).values_list("recipe_id", "ingredient_id", "amount"):
+        recipe_ingredients[recipe_id].append((ingredient_id, amount))
+
+    deltas = Counter()
+    for user_id, recipe_id in cart_items:
+        for ingredient_id, amount in recipe_ingredients[recipe_id]:
+            deltas[user_id, ingredient_id] += sign * amount
+    if not deltas:
+        return
+
+    table = ShoppingListItem._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (user_id, ingredient_id, amount) "
+            "VALUES (%s, %s, %s) "
+            "ON CONFLICT (user_id, ingredient_id) "
+            f"DO UPDATE SET amount = {table}.amount + EXCLUDED.amount",
+            [
+                (user_id, ingredient_id, amount)
+                for (user_id, ingredient_id), amount in deltas.items()
+            ],
+        )
+        if sign < 0:
+            ShoppingListItem.objects.filter(
+                user_id__in={user_id for user_id, _ in cart_items},
+                amount__lte=0,
+            ).delete()
+
+
+def change_recipe_shopping_lists(recipe_id, deltas):
+    # deltas - изменения количеств по id ингредиентов. Списки всех,
+    # у кого рецепт в корзине, меняются одним запросом.
+    deltas = [
+        (ingredient_id, amount)
+        for ingredient_id, amount in deltas.items()
+        if amount
+    ]
+    if not deltas:
+        return
+
+    table = ShoppingListItem._meta.db_table
+    rows = " UNION ALL ".join(
+        ["SELECT %s AS ingredient_id, %s AS amount"] * len(deltas)
+    )
+    # Без точки сохранения: в транзакции API это лишние запросы.
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, ingredient_id, amount) "
+            "SELECT cart.author_id, delta.ingredient_id, delta.amount "
+            f"FROM {ShoppingCart._meta.db_table} AS cart "
+            f"CROSS JOIN ({rows}) AS delta "
+            "WHERE cart.recipe_id = %s "
+            "ON CONFLICT (user_id, ingredient_id) "
+            f"DO UPDATE SET amount = {table}.amount + EXCLUDED.amount",
+            [*chain.from_iterable(deltas), recipe_id],
+        )
+        if cursor.rowcount and any(amount < 0 for _, amount in deltas):
+            ShoppingListItem.objects.filter(
+                user__shopping_cart__recipe_id=recipe_id,
+                ingredient_id__in=[ingredient for ingredient, _ in deltas],
+                amount__lte=0,
+            ).delete()
+
+
+def replace_recipe_ingredients(recipe, recipe_ingredients):
+    # Старые строки удаляются запросом в обход сигналов, а списки
+    # покупок меняются на разницу составов одним запросом.
+    deltas = Counter()
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe=recipe
+    ).values_list("ingredient_id", "amount"):
+        deltas[ingredient_id] -= amount
+    for recipe_ingredient in recipe_ingredients:
+        deltas[recipe_ingredient.ingredient_id] += recipe_ingredient.amount
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {RecipeIngredient._meta.db_table} "
+            "WHERE recipe_id = %s",
+            [recipe.pk],
+        )
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        change_recipe_shopping_lists(recipe.pk, deltas)
+
+
+def calculate_shopping_lists(user_ids):
+    return {
+        (row["user_id"], row["ingredient_id"]): row["total_amount"]
+        for row in RecipeIngredient.objects.filter(
+            recipe__in_shopping_cart__author_id__in=user_ids
+        )
+        .values(
+            "ingredient_id", user_id=F("recipe__in_shopping_cart__author_id")
+        )
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    }
+
+
+# Изменения через save() и delete(), в том числе в админке и при
+# каскадном удалении рецепта. API меняет корзины и ингредиенты
+# рецептов запросами в обход сигналов и обновляет списки сам.
+# Каждый обработчик читает текущее состояние другой таблицы,
+# поэтому при каскаде рецепт вычитается ровно один раз, в каком
+# бы порядке ни удалялись корзины и ингредиенты.
+
+
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_saved_row(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._saved_row = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_saved_cart(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cart_item = (instance.author_id, instance.recipe_id)
+    saved = getattr(instance, "_saved_row", None)
+    if saved is not None:
+        saved_item = (saved.author_id, saved.recipe_id)
+        if saved_item == cart_item:
+            return
+        change_shopping_lists([saved_item], -1)
+    change_shopping_lists([cart_item], 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_deleted_cart(sender, instance, **kwargs):
+    change_shopping_lists([(instance.author_id, instance.recipe_id)], -1)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def add_saved_recipe_ingredient(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Counter({instance.ingredient_id: instance.amount})
+    saved = getattr(instance, "_saved_row", None)
+    if saved is not None:
+        if saved.recipe_id == instance.recipe_id:
+            deltas[saved.ingredient_id] -= saved.amount
+        else:
+            change_recipe_shopping_lists(
+                saved.recipe_id, {saved.ingredient_id: -saved.amount}
+            )
+    change_recipe_shopping_lists(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def remove_deleted_recipe_ingredient(sender, instance, **kwargs):
+    change_recipe_shopping_lists(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Отправляется после загрузки строк в обход save(): bulk_create и
+# COPY не вызывают post_save, а кэши ответов и справочников нужно
+# сбросить. sender - модель загруженных строк.
+bulk_loaded = Signal()
@@ -0,0 +1,56 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import User
+from .models import Recipe
+
+# updated_at рецепта сам обновляется при его сохранении, а здесь -
+# при обновлении изображения в обход save(). Свежесть ответов API
+# определяется версией содержимого в общем кэше, а не этим полем.
+
+
+# Поля автора, которые входят в ответы рецептов.
+AUTHOR_FIELDS = frozenset(
+    ["username", "first_name", "last_name", "email", "avatar"]
+)
+
+
+def update_image_fields(model, pk, lookup, values):
+    if model is Recipe:
+        values = {**values, "updated_at": timezone.now()}
+    return model.objects.filter(pk=pk, **lookup).update(**values)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    # При полном сохранении прежние значения читаются из базы, чтобы
+    # смена пароля и других полей не считалась изменением автора.
+    if raw or instance._state.adding or update_fields is not None:
+        return
+    instance._saved_author_fields = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*AUTHOR_FIELDS)
+        .first()
+    )
+
+
+def get_author_fields(instance):
+    values = []
+    for name in AUTHOR_FIELDS:
+        field = instance._meta.get_field(name)
+        values.append(field.get_prep_value(field.value_from_object(instance)))
+    return tuple(values)
+
+
+def author_fields_changed(instance, created, update_fields=None):
+    # Новый автор ещё не встречается в ответах, а вход обновляет
+    # только last_login.
+    if created:
+        return False
+    if update_fields is not None:
+        return not AUTHOR_FIELDS.isdisjoint(update_fields)
+    saved = getattr(instance, "_saved_author_fields", None)
+    return saved is None or saved != get_author_fields(instance)
@@ -0,0 +1,103 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.ingredient_index import ingredient_index
+from api.metrics import histograms
+from api.short_links import resolve_short_code
+from food.models import Ingredient, Tag
+from .factories import create_user, get_client
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests-default",
+    },
+    "api": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests-api",
+    },
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark", "замеры API")
+    group.addoption(
+        "--benchmark-recipes",
+        type=int,
+        default=300,
+        help="Число рецептов в синтетических данных: 1000, 100000...",
+    )
+    group.addoption("--benchmark-iterations", type=int, default=3)
+    group.addoption("--benchmark-output", help="Сохранить замеры в JSON.")
+    group.addoption(
+        "--benchmark-baseline",
+        help="Сравнить с сохранённым JSON и упасть при регрессии.",
+    )
+    group.addoption("--benchmark-tolerance", type=float, default=0.25)
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(settings, tmp_path):
+    # Кэши, медиафайлы и метрики каждого теста отдельно от рабочих.
+    settings.CACHES = TEST_CACHES
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.METRICS_DIR = str(tmp_path / "metrics")
+    settings.METRICS_TOKEN = "metrics-token"
+    settings.PASSWORD_HASHERS = [
+        "django.contrib.auth.hashers.MD5PasswordHasher"
+    ]
+    for alias in TEST_CACHES:
+        caches[alias].clear()
+    token_cache.clear()
+    resolve_short_code.cache_clear()
+    # Гистограммы процесса начинаются заново в METRICS_DIR теста.
+    histograms.reset()
+    ingredient_index.clear()
+    yield
+    token_cache.clear()
+    resolve_short_code.cache_clear()
+
+
+@pytest.fixture
+def user(db):
+    return create_user("user")
+
+
+@pytest.fixture
+def author(db):
+    return create_user("author")
+
+
+@pytest.fixture
+def user_client(user):
+    return get_client(user)
+
+
+@pytest.fixture
+def author_client(author):
+    return get_client(author)
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f"Тег {number}", slug=f"tag-{number}")
+        for number in range(2)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f"Ингредиент {number}", measurement_unit="г"
+        )
+        for number in range(3)
+    ]
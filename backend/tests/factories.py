@@ -0,0 +1,39 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from food.models import Recipe, RecipeIngredient
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f"{username}@example.com",
+        username=username,
+        password="password",
+        first_name="Имя",
+        last_name="Фамилия",
+    )
+
+
+def create_recipe(author, name, tags=(), ingredients=(), amount=10):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text="Описание",
+        cooking_time=10,
+        image="recipes/images/test.png",
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
@@ -0,0 +1,149 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.authentication import get_auth_version_key, token_cache
+from api.benchmarks import make_image_data
+from api.cache import increment_version
+from users.models import User
+
+TOKEN_TABLE = Token._meta.db_table
+USER_TABLE = User._meta.db_table
+
+
+def get_me(client, table=TOKEN_TABLE):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/users/me/")
+    table_queries = [
+        query["sql"]
+        for query in queries.captured_queries
+        if table in query["sql"]
+    ]
+    return response, table_queries
+
+
+@pytest.mark.django_db
+def test_verified_token_is_not_queried_again(user_client):
+    response, token_queries = get_me(user_client)
+    assert response.status_code == 200
+    assert token_queries
+
+    response, token_queries = get_me(user_client)
+    assert response.status_code == 200
+    assert not token_queries
+
+
+@pytest.mark.django_db
+def test_cached_user_is_not_queried_again(user, user_client):
+    get_me(user_client)
+
+    response, user_queries = get_me(user_client, USER_TABLE)
+
+    assert response.status_code == 200
+    assert response.data["username"] == user.username
+    assert not user_queries
+
+
+@pytest.mark.django_db
+def test_user_save_refreshes_cached_user(
+    user, user_client, django_capture_on_commit_callbacks
+):
+    get_me(user_client)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = "Другое"
+        user.save()
+
+    response = get_me(user_client)[0]
+    assert response.data["first_name"] == "Другое"
+
+
+@pytest.mark.django_db
+def test_logout_rejects_cached_token(
+    user_client, django_capture_on_commit_callbacks
+):
+    get_me(user_client)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post("/api/auth/token/logout/")
+
+    assert response.status_code == 204
+    assert get_me(user_client)[0].status_code == 401
+
+
+@pytest.mark.django_db
+def test_token_deleted_by_other_process_is_rechecked(user, user_client):
+    get_me(user_client)
+    # Другой процесс удаляет токен в обход сигналов этого процесса и
+    # меняет версию токенов пользователя в общем кэше.
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TOKEN_TABLE}")
+    increment_version(get_auth_version_key(user.pk))
+
+    response, token_queries = get_me(user_client)
+
+    assert response.status_code == 401
+    assert token_queries
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected_at_once(
+    user, user_client, django_capture_on_commit_callbacks
+):
+    get_me(user_client)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+
+    assert get_me(user_client)[0].status_code == 401
+
+
+@pytest.mark.django_db
+def test_cached_user_expires(user, user_client, monkeypatch):
+    get_me(user_client)
+    # update() не меняет версию, поэтому помогает только срок записи.
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    assert get_me(user_client)[0].status_code == 200
+
+    now = time.monotonic() + token_cache.ttl
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    assert get_me(user_client)[0].status_code == 401
+
+
+@pytest.mark.django_db
+def test_avatar_update_keeps_counters(user, user_client, tags, ingredients):
+    get_me(user_client)
+    response = user_client.post(
+        "/api/recipes/",
+        {
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": make_image_data(),
+            "tags": [tag.pk for tag in tags],
+            "ingredients": [
+                {"id": ingredient.pk, "amount": 10}
+                for ingredient in ingredients
+            ],
+        },
+        format="json",
+    )
+    assert response.status_code == 201
+
+    response = user_client.put(
+        "/api/users/me/avatar/", {"avatar": make_image_data()}, format="json"
+    )
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert user.recipes_count == 1
+
+    response = user_client.delete("/api/users/me/avatar/")
+    assert response.status_code == 204
+    user.refresh_from_db()
+    assert user.recipes_count == 1
+    assert not user.avatar
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from api.benchmarks import QUERY_BUDGETS
+
+
+@pytest.fixture
+def dataset(request, db):
+    # Пропорции как у generate_dataset по умолчанию.
+    recipes = request.config.getoption("benchmark_recipes")
+    call_command(
+        "generate_dataset",
+        users=max(recipes // 10, 20),
+        recipes=recipes,
+        favorites=recipes * 5,
+        carts=recipes * 2,
+        subscriptions=recipes,
+        seed=1,
+        stdout=io.StringIO(),
+    )
+
+
+def test_benchmark_api(request, dataset, tmp_path):
+    # Тот же прогон, что и benchmark_api; масштаб и baseline задаются
+    # опциями pytest, например --benchmark-recipes=100000.
+    config = request.config
+    output = config.getoption("benchmark_output") or str(
+        tmp_path / "benchmark.json"
+    )
+    stdout = io.StringIO()
+    call_command(
+        "benchmark_api",
+        iterations=config.getoption("benchmark_iterations"),
+        warmup=1,
+        output=output,
+        baseline=config.getoption("benchmark_baseline"),
+        tolerance=config.getoption("benchmark_tolerance"),
+        stdout=stdout,
+    )
+    print(stdout.getvalue())
+
+    with open(output) as file:
+        report = json.load(file)
+    failures = []
+    for key, stats in report["routes"].items():
+        if stats["status"] >= 400:
+            failures.append(f"{key}: код ответа {stats['status']}")
+        if stats["queries"] > QUERY_BUDGETS[key]:
+            failures.append(
+                f"{key}: {stats['queries']} запросов при бюджете "
+                f"{QUERY_BUDGETS[key]}"
+            )
+    assert not failures, "\n".join(failures)
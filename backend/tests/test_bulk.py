@@ -0,0 +1,134 @@
+import pytest
+
+from food.models import Favorite, ShoppingCart, ShoppingListItem, Subscription
+from .factories import create_recipe, create_user
+
+
+@pytest.fixture
+def recipes(author, tags, ingredients):
+    return [
+        create_recipe(author, f"Рецепт {number}", tags, ingredients)
+        for number in range(3)
+    ]
+
+
+def get_outcomes(response):
+    return {item["id"]: item["status"] for item in response.data["results"]}
+
+
+@pytest.mark.django_db
+def test_bulk_favorite_reports_outcome_per_id(user, user_client, recipes):
+    Favorite.objects.create(author=user, recipe=recipes[0])
+    missing = recipes[-1].pk + 1
+
+    response = user_client.post(
+        "/api/recipes/favorite/",
+        {"ids": [recipes[0].pk, recipes[1].pk, missing]},
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert get_outcomes(response) == {
+        recipes[0].pk: "exists",
+        recipes[1].pk: "added",
+        missing: "not_found",
+    }
+    recipes[1].refresh_from_db()
+    assert recipes[1].favorites_count == 1
+
+    response = user_client.delete(
+        "/api/recipes/favorite/",
+        {"ids": [recipes[1].pk, recipes[2].pk]},
+        format="json",
+    )
+
+    assert get_outcomes(response) == {
+        recipes[1].pk: "removed",
+        recipes[2].pk: "absent",
+    }
+    recipes[1].refresh_from_db()
+    assert recipes[1].favorites_count == 0
+
+
+@pytest.mark.django_db
+def test_bulk_shopping_cart_updates_shopping_list(
+    user, user_client, recipes, ingredients
+):
+    response = user_client.post(
+        "/api/recipes/shopping_cart/",
+        {"ids": [recipe.pk for recipe in recipes]},
+        format="json",
+    )
+
+    assert set(get_outcomes(response).values()) == {"added"}
+    assert dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            "ingredient_id", "amount"
+        )
+    ) == {ingredient.pk: 30 for ingredient in ingredients}
+
+    response = user_client.delete("/api/shopping_cart/clear/")
+
+    assert response.status_code == 204
+    assert not ShoppingCart.objects.filter(author=user).exists()
+    assert not ShoppingListItem.objects.filter(user=user).exists()
+    for recipe in recipes:
+        recipe.refresh_from_db()
+        assert recipe.shopping_carts_count == 0
+
+
+@pytest.mark.django_db
+def test_bulk_subscribe_skips_self(user, user_client, author):
+    other = create_user("other")
+
+    response = user_client.post(
+        "/api/users/subscribe/",
+        {"ids": [author.pk, other.pk, user.pk]},
+        format="json",
+    )
+
+    assert get_outcomes(response) == {
+        author.pk: "added",
+        other.pk: "added",
+        user.pk: "self",
+    }
+    assert Subscription.objects.filter(user=user).count() == 2
+    author.refresh_from_db()
+    assert author.subscribers_count == 1
+
+
+@pytest.mark.django_db
+def test_bulk_rejects_too_many_ids(user_client, settings):
+    response = user_client.post(
+        "/api/recipes/favorite/",
+        {"ids": list(range(1, settings.BULK_ACTION_LIMIT + 2))},
+        format="json",
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/recipes/{recipe}/favorite/",
+        "/api/recipes/{recipe}/shopping_cart/",
+        "/api/users/{author}/subscribe/",
+    ],
+)
+def test_repeated_toggle_is_client_error(user_client, author, recipes, url):
+    url = url.format(recipe=recipes[0].pk, author=author.pk)
+
+    assert user_client.post(url).status_code == 201
+    assert user_client.post(url).status_code == 400
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 400
+
+
+@pytest.mark.django_db
+def test_self_subscription_is_rejected(user, user_client):
+    response = user_client.post(f"/api/users/{user.pk}/subscribe/")
+
+    assert response.status_code == 400
+    assert not Subscription.objects.exists()
@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .factories import create_recipe
+
+
+@pytest.fixture
+def recipe(author, tags, ingredients):
+    return create_recipe(author, "Рецепт", tags, ingredients)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("path", ["/api/recipes/", "/api/recipes/{pk}/"])
+def test_unchanged_recipes_answer_not_modified(
+    anonymous_client, recipe, path
+):
+    path = path.format(pk=recipe.pk)
+    etag = anonymous_client.get(path)["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = anonymous_client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert not queries.captured_queries
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("path", ["/api/recipes/", "/api/recipes/{pk}/"])
+def test_recipe_edit_changes_etag(
+    anonymous_client, author_client, recipe, tags, ingredients, path,
+    django_capture_on_commit_callbacks,
+):
+    path = path.format(pk=recipe.pk)
+    etag = anonymous_client.get(path)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(
+            f"/api/recipes/{recipe.pk}/",
+            {
+                "name": "Другое название",
+                "text": "Описание",
+                "cooking_time": 10,
+                "tags": [tag.pk for tag in tags],
+                "ingredients": [{"id": ingredients[0].pk, "amount": 1}],
+            },
+            format="json",
+        )
+    assert response.status_code == 200
+
+    response = anonymous_client.get(path, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_filters_have_own_etags(anonymous_client, recipe, tags):
+    first = anonymous_client.get("/api/recipes/")["ETag"]
+    second = anonymous_client.get(f"/api/recipes/?tags={tags[0].slug}")
+
+    assert second["ETag"] != first
+    assert "Last-Modified" not in second
+
+
+@pytest.mark.django_db
+def test_counter_ordering_has_no_etag(anonymous_client, recipe):
+    response = anonymous_client.get("/api/recipes/?ordering=-favorites_count")
+
+    assert response.status_code == 200
+    assert "ETag" not in response
@@ -0,0 +1,71 @@
+import pytest
+from django.core.management import call_command
+
+from food.models import Recipe
+from users.models import User
+from .factories import create_recipe
+
+
+def refresh(*objects):
+    for obj in objects:
+        obj.refresh_from_db()
+
+
+@pytest.fixture
+def recipe(author, tags, ingredients):
+    return create_recipe(author, "Рецепт", tags, ingredients)
+
+
+@pytest.mark.django_db
+def test_recipe_counters_follow_favorites_and_carts(user_client, recipe):
+    user_client.post(f"/api/recipes/{recipe.pk}/favorite/")
+    user_client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+    refresh(recipe)
+    assert (recipe.favorites_count, recipe.shopping_carts_count) == (1, 1)
+
+    user_client.delete(f"/api/recipes/{recipe.pk}/favorite/")
+    user_client.delete(f"/api/recipes/{recipe.pk}/shopping_cart/")
+    refresh(recipe)
+    assert (recipe.favorites_count, recipe.shopping_carts_count) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_author_counters_follow_recipes_and_subscriptions(
+    user_client, author, recipe
+):
+    user_client.post(f"/api/users/{author.pk}/subscribe/")
+    refresh(author)
+    assert (author.recipes_count, author.subscribers_count) == (1, 1)
+
+    user_client.delete(f"/api/users/{author.pk}/subscribe/")
+    recipe.delete()
+    refresh(author)
+    assert (author.recipes_count, author.subscribers_count) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_repeated_removal_does_not_go_negative(user_client, recipe):
+    user_client.post(f"/api/recipes/{recipe.pk}/favorite/")
+    user_client.delete(f"/api/recipes/{recipe.pk}/favorite/")
+    response = user_client.delete(f"/api/recipes/{recipe.pk}/favorite/")
+
+    assert response.status_code == 400
+    refresh(recipe)
+    assert recipe.favorites_count == 0
+
+
+@pytest.mark.django_db
+def test_reconcile_repairs_drift(user_client, author, recipe):
+    user_client.post(f"/api/recipes/{recipe.pk}/favorite/")
+    Recipe.objects.filter(pk=recipe.pk).update(
+        favorites_count=5, shopping_carts_count=3
+    )
+    User.objects.filter(pk=author.pk).update(
+        recipes_count=0, subscribers_count=2
+    )
+
+    call_command("reconcile_counters", batch_size=1)
+
+    refresh(recipe, author)
+    assert (recipe.favorites_count, recipe.shopping_carts_count) == (1, 0)
+    assert (author.recipes_count, author.subscribers_count) == (1, 0)
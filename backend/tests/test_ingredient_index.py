@@ -0,0 +1,38 @@
+import pytest
+
+from api import ingredient_index as module
+from api.ingredient_index import ingredient_index
+from food.models import Ingredient
+
+
+@pytest.mark.django_db
+def test_version_is_checked_once_per_interval(ingredients, monkeypatch):
+    ingredient_index.search("инг")
+    calls = []
+    monkeypatch.setattr(
+        module, "get_version", lambda key: calls.append(key) or 0
+    )
+
+    for _ in range(10):
+        ingredient_index.search("инг")
+
+    assert calls == []
+
+
+@pytest.mark.django_db
+def test_index_is_rebuilt_on_commit(
+    ingredients, django_capture_on_commit_callbacks
+):
+    ingredient_index.search("инг")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name="Инжир", measurement_unit="г")
+    # Пересборка прошла при фиксации, поиск берёт готовую копию.
+    assert not ingredient_index._stale
+    assert ingredient_index.search("инж") == [
+        {
+            "id": Ingredient.objects.get(name="Инжир").pk,
+            "name": "Инжир",
+            "measurement_unit": "г",
+        }
+    ]
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from food.models import Ingredient
+
+
+def write_json(path, items):
+    path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.django_db
+def test_json_file_is_loaded_without_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "food.management.commands.load_ingredients.JSON_CHUNK_SIZE", 7
+    )
+    path = write_json(
+        tmp_path / "ingredients.json",
+        [
+            {"name": "соль", "measurement_unit": "г"},
+            {"name": " соль ", "measurement_unit": "г"},
+            {"name": "молоко", "measurement_unit": "мл"},
+        ],
+    )
+
+    call_command("load_ingredients", path, no_copy=True)
+
+    assert set(
+        Ingredient.objects.values_list("name", "measurement_unit")
+    ) == {("соль", "г"), ("молоко", "мл")}
+
+
+@pytest.mark.django_db
+def test_too_long_name_is_rejected(tmp_path):
+    path = write_json(
+        tmp_path / "ingredients.json",
+        [
+            {"name": "соль", "measurement_unit": "г"},
+            {"name": "с" * 65, "measurement_unit": "г"},
+        ],
+    )
+
+    with pytest.raises(CommandError, match="Запись 2"):
+        call_command("load_ingredients", path, no_copy=True)
+
+    assert not Ingredient.objects.exists()
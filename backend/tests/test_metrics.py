@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_server_timing_and_metrics_report_encoding(anonymous_client):
+    response = anonymous_client.get("/api/tags/")
+    timings = [
+        part.strip().split(";")[0]
+        for part in response["Server-Timing"].split(",")
+    ]
+    assert timings == ["db", "encode", "app", "total"]
+
+    response = anonymous_client.get(
+        "/api/_metrics", HTTP_AUTHORIZATION="Bearer metrics-token"
+    )
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert 'foodgram_encode_duration_seconds_count{route="tags-list"' in (
+        content
+    )
+    assert "render_duration" not in content
@@ -0,0 +1,52 @@
+import base64
+import json
+
+import pytest
+
+from .factories import create_recipe
+
+
+def make_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+@pytest.mark.django_db
+def test_cursor_pages_follow_each_other(anonymous_client, author):
+    for number in range(3):
+        create_recipe(author, f"Рецепт {number}")
+
+    first = anonymous_client.get("/api/recipes/?cursor=&limit=2")
+    response = anonymous_client.get(first.data["next"])
+
+    assert [recipe["name"] for recipe in response.data["results"]] == [
+        "Рецепт 2"
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "position",
+    [
+        ["Рецепт", "1"],
+        [1, 1],
+        ["Рецепт", True],
+        ["Рецепт", None],
+        ["Рецепт", 2 ** 63],
+        ["Рецепт", [1]],
+    ],
+)
+def test_bad_cursor_is_not_found(anonymous_client, position):
+    response = anonymous_client.get(
+        f"/api/recipes/?cursor={make_cursor(position)}"
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_bad_subscription_cursor_is_not_found(user_client):
+    response = user_client.get(
+        f"/api/users/subscriptions/?cursor={make_cursor(['1'])}"
+    )
+
+    assert response.status_code == 404
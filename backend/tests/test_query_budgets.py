@@ -0,0 +1,157 @@
+import difflib
+import re
+
+import pytest
+
+from api.benchmarks import QUERY_BUDGETS, ROUTES, RouteRunner, build_context
+from api.cache import increment_version
+from api.short_links import encode_short_code
+from food.models import Favorite, Ingredient, ShoppingCart, Subscription, Tag
+from food.search import rebuild_search_index
+from .factories import create_recipe, create_user
+
+SIZES = (1, 3, 8)
+LITERALS = re.compile(r"'[^']*'|\b\d+\b")
+USERS_ME = next(route for route in ROUTES if route.name == "users-me")
+
+
+def build_fixture(size):
+    # Все связи пользователя растут вместе с size: подписки на авторов,
+    # их рецепты, избранное, корзина, ингредиенты и теги рецептов.
+    # Ещё один автор с рецептом нужен для добавления и удаления.
+    prefix = f"budget{size}"
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"{prefix} ингредиент {number}", measurement_unit="г")
+        for number in range(size)
+    )
+    ingredients = list(Ingredient.objects.filter(name__startswith=prefix))
+    tags = [
+        Tag.objects.create(
+            name=f"{prefix} тег {number}", slug=f"{prefix}-{number}"
+        )
+        for number in range(size)
+    ]
+    user = create_user(prefix)
+    for number in range(size):
+        author = create_user(f"{prefix}_{number}")
+        Subscription.objects.create(user=user, author=author)
+        for index in range(size):
+            recipe = create_recipe(
+                author, f"{prefix} рецепт {number} {index}", tags, ingredients
+            )
+            Favorite.objects.create(author=user, recipe=recipe)
+            ShoppingCart.objects.create(author=user, recipe=recipe)
+    # Тело запроса на создание рецепта одинаково для всех size.
+    payload = [
+        Ingredient.objects.create(
+            name=f"{prefix} продукт {number}", measurement_unit="г"
+        )
+        for number in range(5)
+    ]
+    other = create_user(f"{prefix}_other")
+    create_recipe(other, f"{prefix} другой рецепт", tags, ingredients)
+    # Индекс обновляется после коммита, а тест его не делает.
+    rebuild_search_index()
+
+    context = build_context(user)
+    context.update(
+        recipe=recipe.pk,
+        short_code=encode_short_code(recipe.pk),
+        author=author.pk,
+        tag=tags[0].slug,
+        tag_id=tags[0].pk,
+    )
+    context["recipe_data"]["ingredients"] = [
+        {"id": ingredient.pk, "amount": 10} for ingredient in payload
+    ]
+    return context
+
+
+def get_setup(route):
+    # Маршруты, которые должны пройти до измеряемого: создание
+    # объекта, который он меняет, и парный запрос с тем же именем.
+    index = ROUTES.index(route)
+    setup = [
+        previous
+        for previous in ROUTES
+        if previous.store and "{%s}" % previous.store in route.path
+    ]
+    setup += [
+        previous
+        for previous in ROUTES[:index]
+        if previous.name == route.name
+        and previous.method != "get"
+        and previous not in setup
+    ]
+    return setup
+
+
+def measure(route, size, assert_max_num_queries=None):
+    context = build_fixture(size)
+    runner = RouteRunner(context)
+    # Первый запрос прогревает ленивые кэши процесса: токен,
+    # справочники и индекс ингредиентов.
+    runner.run(USERS_ME)
+    for step in get_setup(route):
+        result = runner.run(step)
+        assert result.status < 400, f"{step.name}: {result.status}"
+    if not runner.is_available(route):
+        pytest.skip(f"{route.name}: нет данных для запроса.")
+    if route.method == "get":
+        runner.run(route)
+    if not route.auth:
+        increment_version()
+    if assert_max_num_queries is None:
+        result = runner.run(route)
+    else:
+        with assert_max_num_queries:
+            result = runner.run(route)
+    assert result.status < 400, f"{route.name}: {result.status}"
+    return result
+
+
+def describe(title, before, after):
+    # Литералы заменяются, чтобы в diff остались только различия
+    # в самих запросах, а не в id.
+    diff = difflib.unified_diff(
+        [LITERALS.sub("?", sql) for sql in before],
+        [LITERALS.sub("?", sql) for sql in after],
+        "меньше данных",
+        "больше данных",
+        lineterm="",
+    )
+    return "\n".join([title, *diff])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "route",
+    ROUTES,
+    ids=[f"{route.method.upper()} {route.name}" for route in ROUTES],
+)
+def test_query_budget(route, django_assert_max_num_queries):
+    key = f"{route.method.upper()} {route.name}"
+    budget = QUERY_BUDGETS[key]
+    results = [measure(route, size) for size in SIZES[:-1]]
+    results.append(
+        measure(route, SIZES[-1], django_assert_max_num_queries(budget))
+    )
+    first, last = results[0], results[-1]
+    if len(last.queries) > len(first.queries):
+        pytest.fail(
+            describe(
+                f"{key}: число запросов растёт с объёмом данных",
+                first.queries,
+                last.queries,
+            )
+        )
+
+
+@pytest.mark.django_db
+def test_search_route_finds_indexed_recipes(anonymous_client):
+    context = build_fixture(SIZES[0])
+    response = anonymous_client.get(
+        f"/api/recipes/?search={context['search']}"
+    )
+    assert response.status_code == 200
+    assert response.data["count"] == 2
@@ -0,0 +1,189 @@
+import os
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import FileResponse
+
+from food.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from food.shopping_list import calculate_shopping_lists
+from .factories import create_recipe, create_user
+
+
+def get_shopping_list(user):
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            "ingredient_id", "amount"
+        )
+    )
+
+
+def assert_matches_carts(user):
+    expected = calculate_shopping_lists([user.pk])
+    assert get_shopping_list(user) == {
+        ingredient_id: amount
+        for (_, ingredient_id), amount in expected.items()
+    }
+
+
+@pytest.fixture
+def recipes(author, tags, ingredients):
+    return [
+        create_recipe(author, "Первый", tags, ingredients[:2], amount=10),
+        create_recipe(author, "Второй", tags, ingredients[1:], amount=5),
+    ]
+
+
+@pytest.mark.django_db
+def test_adding_recipes_sums_shared_ingredients(
+    user, user_client, recipes, ingredients
+):
+    for recipe in recipes:
+        response = user_client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+        assert response.status_code == 201
+
+    assert get_shopping_list(user) == {
+        ingredients[0].pk: 10,
+        ingredients[1].pk: 15,
+        ingredients[2].pk: 5,
+    }
+    assert_matches_carts(user)
+
+
+@pytest.mark.django_db
+def test_removing_recipe_subtracts_and_drops_empty_rows(
+    user, user_client, recipes, ingredients
+):
+    for recipe in recipes:
+        user_client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+
+    response = user_client.delete(
+        f"/api/recipes/{recipes[0].pk}/shopping_cart/"
+    )
+
+    assert response.status_code == 204
+    assert get_shopping_list(user) == {
+        ingredients[1].pk: 5,
+        ingredients[2].pk: 5,
+    }
+
+
+@pytest.mark.django_db
+def test_editing_recipe_ingredients_updates_carts(
+    user, user_client, author_client, recipes, ingredients, tags
+):
+    user_client.post(f"/api/recipes/{recipes[0].pk}/shopping_cart/")
+
+    response = author_client.patch(
+        f"/api/recipes/{recipes[0].pk}/",
+        {
+            "name": "Первый",
+            "text": "Описание",
+            "cooking_time": 10,
+            "tags": [tag.pk for tag in tags],
+            "ingredients": [{"id": ingredients[2].pk, "amount": 7}],
+        },
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert get_shopping_list(user) == {ingredients[2].pk: 7}
+
+
+@pytest.mark.django_db
+def test_deleting_recipe_removes_it_from_shopping_lists(
+    user, user_client, author_client, recipes
+):
+    user_client.post(f"/api/recipes/{recipes[0].pk}/shopping_cart/")
+
+    response = author_client.delete(f"/api/recipes/{recipes[0].pk}/")
+
+    assert response.status_code == 204
+    assert get_shopping_list(user) == {}
+
+
+@pytest.mark.django_db
+def test_rebuild_repairs_drifted_lists(user, user_client, recipes):
+    for recipe in recipes:
+        user_client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+    ShoppingListItem.objects.filter(user=user).update(amount=1)
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_shopping_lists", "--check")
+    call_command("rebuild_shopping_lists")
+
+    assert_matches_carts(user)
+    call_command("rebuild_shopping_lists", "--check")
+
+
+@pytest.mark.django_db
+def test_orm_changes_update_shopping_lists(user, author, recipes, ingredients):
+    # Так меняют корзины и составы рецептов админка и код вне API.
+    cart = ShoppingCart.objects.create(author=user, recipe=recipes[0])
+    assert_matches_carts(user)
+
+    recipe_ingredient = RecipeIngredient.objects.get(
+        recipe=recipes[0], ingredient=ingredients[0]
+    )
+    recipe_ingredient.amount = 3
+    recipe_ingredient.save()
+    assert_matches_carts(user)
+
+    recipe_ingredient.ingredient = ingredients[2]
+    recipe_ingredient.save()
+    assert_matches_carts(user)
+
+    RecipeIngredient.objects.create(
+        recipe=recipes[0], ingredient=ingredients[0], amount=4
+    )
+    assert_matches_carts(user)
+
+    recipe_ingredient.delete()
+    assert_matches_carts(user)
+
+    cart.recipe = recipes[1]
+    cart.save()
+    assert_matches_carts(user)
+
+    cart.delete()
+    assert get_shopping_list(user) == {}
+
+
+@pytest.mark.django_db
+def test_orm_recipe_delete_subtracts_once(user, author, recipes):
+    for recipe in recipes:
+        ShoppingCart.objects.create(author=user, recipe=recipe)
+    other = create_user("other")
+    ShoppingCart.objects.create(author=other, recipe=recipes[0])
+
+    recipes[0].delete()
+
+    assert_matches_carts(user)
+    assert get_shopping_list(other) == {}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "file_format, streaming", [("txt", True), ("csv", True), ("pdf", False)]
+)
+def test_download_formats(
+    user, user_client, recipes, settings, file_format, streaming
+):
+    if file_format == "pdf":
+        pytest.importorskip("reportlab")
+        font = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+        if not os.path.exists(font):
+            pytest.skip("Нет шрифта DejaVuSans.")
+        settings.SHOPPING_LIST_PDF_FONT = font
+    user_client.post(f"/api/recipes/{recipes[0].pk}/shopping_cart/")
+
+    response = user_client.get(
+        f"/api/recipes/download_shopping_cart/?format={file_format}"
+    )
+
+    assert response.status_code == 200
+    content = b"".join(response.streaming_content)
+    assert content
+    assert isinstance(response, FileResponse) is not streaming
+    if file_format == "pdf":
+        assert content.startswith(b"%PDF")
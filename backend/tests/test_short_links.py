@@ -0,0 +1,28 @@
+import pytest
+
+from api.short_links import MAX_RECIPE_ID, decode_short_code, encode_short_code
+from .factories import create_recipe
+
+
+def test_code_round_trip():
+    for recipe_id in (1, 61, 62, MAX_RECIPE_ID):
+        assert decode_short_code(encode_short_code(recipe_id)) == recipe_id
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "short_code",
+    [encode_short_code(MAX_RECIPE_ID + 1), "z" * 11, "z" * 500, "a-b"],
+)
+def test_bad_code_is_not_found(anonymous_client, short_code):
+    assert anonymous_client.get(f"/s/{short_code}/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_code_redirects_to_recipe(anonymous_client, author):
+    recipe = create_recipe(author, "Рецепт")
+
+    response = anonymous_client.get(f"/s/{encode_short_code(recipe.pk)}/")
+
+    assert response.status_code == 302
+    assert response["Location"].endswith(f"/recipes/{recipe.pk}")
@@ -0,0 +1,41 @@
+import pytest
+
+from food.models import Subscription
+from .factories import create_recipe, create_user
+
+
+@pytest.fixture
+def author_recipes(author):
+    return [create_recipe(author, f"Рецепт {number}") for number in range(3)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("recipes_limit, expected", [("1", 1), ("abc", 3)])
+def test_feed_limits_recipes(
+    user, author, user_client, author_recipes, recipes_limit, expected
+):
+    Subscription.objects.create(user=user, author=author)
+
+    response = user_client.get(
+        f"/api/users/subscriptions/?recipes_limit={recipes_limit}"
+    )
+
+    assert response.status_code == 200
+    assert len(response.data["results"][0]["recipes"]) == expected
+
+
+@pytest.mark.django_db
+def test_negative_recipes_limit_is_rejected(
+    user, author, user_client, author_recipes
+):
+    Subscription.objects.create(user=user, author=author)
+
+    response = user_client.get("/api/users/subscriptions/?recipes_limit=-1")
+    assert response.status_code == 400
+
+    other = create_user("other")
+    response = user_client.post(
+        f"/api/users/{other.pk}/subscribe/?recipes_limit=-1"
+    )
+    assert response.status_code == 400
+    assert not Subscription.objects.filter(user=user, author=other).exists()
@@ -0,0 +1,49 @@
+import base64
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+
+from api.benchmarks import make_image_data
+from api.uploads import ImageUploadHandler
+
+
+def make_upload(content, name="avatar.png"):
+    return SimpleUploadedFile(name, content, content_type="image/png")
+
+
+@pytest.mark.django_db
+def test_multipart_avatar_is_accepted(user_client):
+    content = base64.b64decode(make_image_data().split(",", 1)[1])
+
+    response = user_client.put(
+        "/api/users/me/avatar/",
+        {"avatar": make_upload(content)},
+        format="multipart",
+    )
+
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_multipart_non_image_is_rejected(user_client):
+    response = user_client.put(
+        "/api/users/me/avatar/",
+        {"avatar": make_upload(b"not an image")},
+        format="multipart",
+    )
+
+    assert response.status_code == 400
+
+
+def test_plain_forms_do_not_use_image_handler():
+    # Админка и другие формы вне DRF загружают любые файлы.
+    request = RequestFactory().post(
+        "/admin/", {"file": make_upload(b"not an image", "notes.txt")}
+    )
+
+    assert request.FILES["file"].read() == b"not an image"
+    assert not any(
+        isinstance(handler, ImageUploadHandler)
+        for handler in request.upload_handlers
+    )
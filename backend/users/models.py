@@ -51,6 +51,15 @@ class User(AbstractUser):
     avatar = models.ImageField(
         verbose_name="Аватар", upload_to="users/", blank=True, null=True
     )
+    avatar_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество рецептов"
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество подписчиков"
+    )
 
     class Meta:
         verbose_name = "Пользователь"